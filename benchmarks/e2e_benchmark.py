@@ -0,0 +1,153 @@
+"""End-to-end benchmark of file reading, indexing and querying against deterministic local fakes.
+
+Run from the repository root:
+    python -m benchmarks.e2e_benchmark --language python --files 1000 --queries 50 --output bench_results.jsonl
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from langchain_core.language_models import FakeListChatModel
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from src.ai.ai_code_analyzer.ai_analyzer import AiProjectAnalyzer
+from src.database.answer_cache import AnswerCache
+from src.database.checkpoint_store import get_checkpointer
+from src.database.chromadb_manager import ChromaDBManager
+from src.util.file_reader import FileReader
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+FILES_PER_PACKAGE = 50
+
+
+def python_source(index: int) -> str:
+    previous = max(index - 1, 0)
+    return (
+        f"import os\n\nfrom package_{previous // FILES_PER_PACKAGE}.module_{previous} import Service{previous}\n\n\n"
+        f"class Service{index}:\n"
+        f"    \"\"\"Generated service number {index}.\"\"\"\n\n"
+        f"    def __init__(self, name):\n        self.name = name\n\n"
+        f"    def handle_{index}(self, request):\n"
+        f"        return Service{previous}(self.name).handle_{previous}(request)\n\n\n"
+        f"def helper_{index}(values):\n    return [value * {index} for value in values]\n"
+    )
+
+
+def java_source(index: int) -> str:
+    previous = max(index - 1, 0)
+    package = f"com.bench.package{index // FILES_PER_PACKAGE}"
+    return (
+        f"package {package};\n\nimport java.util.List;\n\n"
+        f"public class Service{index} {{\n"
+        f"    private final String name;\n\n"
+        f"    public Service{index}(String name) {{\n        this.name = name;\n    }}\n\n"
+        f"    public List<String> handle{index}(List<String> request) {{\n"
+        f"        return new Service{previous}(name).handle{previous}(request);\n    }}\n}}\n"
+    )
+
+
+def generate_project(root: str, language: str, file_count: int):
+    """Write a synthetic project of file_count source files spread over packages."""
+    for index in range(file_count):
+        package_dir = os.path.join(root, f"package_{index // FILES_PER_PACKAGE}")
+        os.makedirs(package_dir, exist_ok=True)
+        if language == "python":
+            path, source = os.path.join(package_dir, f"module_{index}.py"), python_source(index)
+        else:
+            path, source = os.path.join(package_dir, f"Service{index}.java"), java_source(index)
+        with open(path, "w") as file:
+            file.write(source)
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(language: str, file_count: int, query_count: int, latency_ms: float) -> dict:
+    with tempfile.TemporaryDirectory() as workdir, FakeEmbeddingServer(latency_seconds=latency_ms / 1000) as server:
+        project_path = os.path.join(workdir, "project")
+        generate_project(project_path, language, file_count)
+
+        start = time.perf_counter()
+        read_files = sum(1 for _ in FileReader(project_path, language, max_workers=4).iter_file_contents())
+        read_seconds = time.perf_counter() - start
+
+        chroma_db = ChromaDBManager(chroma_path=os.path.join(workdir, "chroma"), embedding_url=server.url)
+        start = time.perf_counter()
+        chroma_db.add_files_from_project_to_db(project_path, language)
+        index_seconds = time.perf_counter() - start
+        embeddings = server.requests
+
+        start = time.perf_counter()
+        chroma_db.add_files_from_project_to_db(project_path, language)
+        reindex_seconds = time.perf_counter() - start
+
+        analyzer = AiProjectAnalyzer(
+            project_path, model_name="fake", model_type="fake", chroma_db=chroma_db,
+            answer_cache=AnswerCache(os.path.join(workdir, "answer_cache.sqlite3")),
+            checkpointer=get_checkpointer(os.path.join(workdir, "checkpoints.sqlite3")),
+            llm=FakeListChatModel(responses=["### Answer\nThe generated services delegate to each other."]))
+        latencies = []
+        for index in range(query_count):
+            start = time.perf_counter()
+            # a thread per query keeps every query standalone, without a question rewrite before retrieval
+            analyzer.query_model(f"What does Service{index % file_count} do with request {index}?",
+                                 project_path, language, reindex=False, thread_id=f"benchmark-{index}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "commit": git_commit(),
+        "language": language,
+        "files": file_count,
+        "queries": query_count,
+        "embedding_latency_ms": latency_ms,
+        "read_files_per_sec": read_files / read_seconds,
+        "index_seconds": index_seconds,
+        "index_files_per_sec": file_count / index_seconds,
+        "embeddings": embeddings,
+        "embeddings_per_sec": embeddings / index_seconds,
+        "reindex_unchanged_seconds": reindex_seconds,
+        "query_p50_ms": percentile(latencies, 0.5),
+        "query_p95_ms": percentile(latencies, 0.95),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--language", choices=["python", "java"], default="python")
+    parser.add_argument("--files", type=int, default=1000, help="synthetic project size, e.g. 100 to 50000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated latency per embedding request")
+    parser.add_argument("--output", help="append the results as one JSON line to this file")
+    args = parser.parse_args()
+
+    results = run(args.language, args.files, args.queries, args.latency_ms)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "a") as file:
+            file.write(json.dumps(results) + "\n")
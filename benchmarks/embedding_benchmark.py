@@ -0,0 +1,43 @@
+"""Measure embedding throughput of OllamaLangchainEmbeddings against a local fake server.
+
+Run from the repository root:
+    python -m benchmarks.embedding_benchmark --documents 2000 --batch-sizes 1,16,64 --workers 1,4,8
+"""
+import argparse
+import time
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from src.ai.embeddings.OllamaLangchainEmbeddings import OllamaLangchainEmbeddings
+
+
+def synthetic_documents(count: int) -> list:
+    return [f"class Generated{i}:\n    def method_{i}(self):\n        return {i}\n" for i in range(count)]
+
+
+def run(documents: int, batch_sizes: list, workers: list, latency_ms: float):
+    texts = synthetic_documents(documents)
+    with FakeEmbeddingServer(latency_seconds=latency_ms / 1000) as server:
+        print(f"{'batch':>6} {'workers':>8} {'seconds':>9} {'docs/sec':>10}")
+        for batch_size in batch_sizes:
+            for max_workers in workers:
+                embeddings = OllamaLangchainEmbeddings(model_name="fake", url=server.url,
+                                                       batch_size=batch_size, max_workers=max_workers)
+                start = time.perf_counter()
+                vectors = embeddings.embed_documents(texts)
+                elapsed = time.perf_counter() - start
+                assert len(vectors) == len(texts)
+                print(f"{batch_size:>6} {max_workers:>8} {elapsed:>9.2f} {len(texts) / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="1,16,64")
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated latency per embedding request")
+    args = parser.parse_args()
+
+    run(args.documents,
+        [int(size) for size in args.batch_sizes.split(",")],
+        [int(count) for count in args.workers.split(",")],
+        args.latency_ms)
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_embedding(text: str, dimension: int) -> list:
+    """Deterministic pseudo-embedding derived from the SHA-256 digest of the text."""
+    digest = hashlib.sha256(text.encode()).digest()
+    return [digest[i % len(digest)] / 255 for i in range(dimension)]
+
+
+class FakeEmbeddingServer:
+    """Local stand-in for the Ollama embeddings endpoint with a configurable per-request latency."""
+
+    def __init__(self, port: int = 0, dimension: int = 64, latency_seconds: float = 0.005):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(server.latency_seconds)
+                server.requests += 1
+                payload = json.dumps({"embedding": fake_embedding(body["prompt"], server.dimension)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.dimension = dimension
+        self.latency_seconds = latency_seconds
+        self.requests = 0
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.http_server.server_address
+        return f"http://{host}:{port}/api/embeddings"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.http_server.shutdown()
+        self.http_server.server_close()
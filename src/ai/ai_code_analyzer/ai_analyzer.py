@@ -1,16 +1,39 @@
-from langgraph.checkpoint.memory import MemorySaver
+import logging
+import time
+from typing import Iterator
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 from langgraph.graph.state import CompiledStateGraph
 
-from src.ai.ai_handler import AiHandler
+from src.ai.ai_handler import AiHandler, CONTEXTUALIZE_TAG
+from src.ai.structural_queries import answer_structural_query
+from src.database.answer_cache import AnswerCache, answer_cache_key
+from src.database.checkpoint_store import KEEP_CHECKPOINTS, get_checkpointer
+from src.database.chromadb_manager import ANSWER_CACHE_PATH, CHECKPOINT_PATH
 from src.domain.query_state import QueryState
+from src.util.metrics import metrics
+
+QUERY_LABEL_LENGTH = 80
+MESSAGE_WINDOW = 10
 
 
 class AiProjectAnalyzer:
 
-    def __init__(self, project_path: str, model_name: str, model_type: str):
-        self.ai_handler = AiHandler(project_path=project_path, model_name=model_name, model_type=model_type)
+    def __init__(self, project_path: str, model_name: str, model_type: str, chroma_db=None, answer_cache=None,
+                 llm=None, checkpointer=None, message_window: int = MESSAGE_WINDOW,
+                 keep_checkpoints: int = KEEP_CHECKPOINTS):
+        """Conversation state is checkpointed to SQLite per thread, keeping the last message_window messages
+        as chat history and only the latest keep_checkpoints checkpoints of each thread."""
+        self.ai_handler = AiHandler(project_path=project_path, model_name=model_name, model_type=model_type,
+                                    chroma_db=chroma_db, llm=llm)
+        self.answer_cache = answer_cache or AnswerCache(ANSWER_CACHE_PATH)
+        self.checkpointer = checkpointer or get_checkpointer(CHECKPOINT_PATH)
+        self.message_window = message_window
+        self.keep_checkpoints = keep_checkpoints
         self.state_graph = self.build_graph()
+        self.last_stream_timings = {}
 
     def build_graph(self) -> CompiledStateGraph:
         workflow = StateGraph(QueryState)
@@ -20,41 +43,186 @@ class AiProjectAnalyzer:
         workflow.set_entry_point("process_query")
         workflow.set_finish_point("process_query")
 
-        return workflow.compile(checkpointer=MemorySaver())
+        return workflow.compile(checkpointer=self.checkpointer)
 
-    def process_query(self, state: QueryState) -> QueryState:
-        """Process the query using chat history from summary.txt and generate a response."""
+    def process_query(self, state: QueryState, config: RunnableConfig) -> dict:
+        """Process the query with the thread's recent messages as chat history and generate a response."""
         query = state.get("query", "")
-        project_path = state.get("project_path", "")
+        history = state.get("messages", [])
 
         llm_input = {
             "input": query,
-            "configurable": {"thread_id": project_path}
+            "standalone_question": state.get("standalone_question", ""),
+            "chat_history": history,
+            "project_map": self.ai_handler.chroma_db.symbol_index.project_map(state.get("project_path", ""))
+        }
+
+        # the node's config carries the graph's callbacks, which token streaming depends on
+        response = self.ai_handler.rag_chain.invoke(llm_input, config)
+
+        return {
+            "response": response["answer"],
+            "retrieved_files": response["context"],
+            "messages": self.turn_messages(history, query, response["answer"]),
         }
 
-        response = self.ai_handler.rag_chain.invoke(llm_input)
-        state["response"] = response["answer"]
+    def turn_messages(self, history: list, query: str, response: str) -> list:
+        """Messages recording a turn, dropping the oldest so the history, and the checkpoint holding it, stays
+        within the window."""
+        overflow = max(len(history) + 2 - self.message_window, 0)
+        return [RemoveMessage(id=message.id) for message in history[:overflow]] + [
+            HumanMessage(content=query), AIMessage(content=response)]
 
-        return state
+    def thread_history(self, thread: dict) -> list:
+        return self.state_graph.get_state(thread).values.get("messages", [])
 
-    def query_model(self, query: str, project_path: str, language: str) -> str:
-        """Generate a chat response using ChatOllama with summary.txt as context."""
+    def record_turn(self, thread: dict, history: list, query: str, response: str):
+        """Add a turn answered without running the graph, from the symbol index or the answer cache, to the
+        thread's history, so follow-ups see it like any other turn."""
+        self.state_graph.update_state(thread, {
+            "query": query,
+            "response": response,
+            "retrieved_files": [],
+            "messages": self.turn_messages(history, query, response),
+        }, as_node="process_query")
+        self.checkpointer.prune(thread["configurable"]["thread_id"], self.keep_checkpoints)
+
+    def refresh_index(self, project_path: str, language: str):
+        """Bring the project's index up to date unless a watcher already keeps it live."""
+        chroma_db = self.ai_handler.chroma_db
+        if not chroma_db.is_watching(project_path, language):
+            chroma_db.add_files_from_project_to_db(project_path, language)
+
+    def query_model(self, query: str, project_path: str, language: str, reindex: bool = True,
+                    thread_id: str | None = None) -> str:
+        """Generate a chat response, reindexing the project first unless the caller keeps the index fresh.
+
+        Queries share the project's conversation thread unless a separate thread_id is given, which lets
+        independent queries run concurrently on one analyzer.
+        """
+        with metrics.query_scope(query[:QUERY_LABEL_LENGTH]):
+            return self.answer_query(query, project_path, language, reindex, thread_id or project_path)
+
+    def answer_query(self, query: str, project_path: str, language: str, reindex: bool, thread_id: str) -> str:
 
         # self.ai_handler.retrieve_documents(query)
 
+        if reindex:
+            self.refresh_index(project_path, language)
+
+        thread = {"configurable": {"thread_id": thread_id}}
+        history = self.thread_history(thread)
+        cached_response, question, query_embedding = self.prepared_answer(query, history, project_path, language)
+        if cached_response is not None:
+            self.record_turn(thread, history, query, cached_response)
+            return cached_response
+
         input_data = {
             "query": query,
+            "standalone_question": question,
             "project_path": project_path,
             "response": ""
         }
 
-        self.ai_handler.chroma_db.add_files_from_project_to_db(project_path, language)
-
+        start = time.perf_counter()
         final_state = None
-        thread = {"configurable": {"thread_id": project_path}}
 
         for state in self.state_graph.stream(input_data, thread):
             final_state = state
+        self.checkpointer.prune(thread_id, self.keep_checkpoints)
         response = final_state["process_query"]["response"]
 
+        self.remember_answer(question, query_embedding, project_path, language, response,
+                             final_state["process_query"]["retrieved_files"], time.perf_counter() - start)
+        return response
+
+    def stream_query(self, query: str, project_path: str, language: str, reindex: bool = True) -> Iterator[str]:
+        """Yield answer tokens as the LLM produces them, recording time to first token and total latency."""
+        with metrics.query_scope(query[:QUERY_LABEL_LENGTH]):
+            yield from self.stream_answer(query, project_path, language, reindex)
+
+    def stream_answer(self, query: str, project_path: str, language: str, reindex: bool) -> Iterator[str]:
+        start = time.perf_counter()
+        if reindex:
+            self.refresh_index(project_path, language)
+
+        thread = {"configurable": {"thread_id": project_path}}
+        history = self.thread_history(thread)
+        cached_response, question, query_embedding = self.prepared_answer(query, history, project_path, language)
+        if cached_response is not None:
+            self.record_turn(thread, history, query, cached_response)
+            yield cached_response
+            self.last_stream_timings = dict.fromkeys(("time_to_first_token_ms", "total_ms"),
+                                                     (time.perf_counter() - start) * 1000)
+            return
+
+        input_data = {
+            "query": query,
+            "standalone_question": question,
+            "project_path": project_path,
+            "response": ""
+        }
+
+        first_token_at = None
+        for message_chunk, metadata in self.state_graph.stream(input_data, thread, stream_mode="messages"):
+            if metadata.get("langgraph_node") != "process_query" or CONTEXTUALIZE_TAG in metadata.get("tags", []):
+                continue
+            # the messages the node writes to the state are streamed as well; only LLM token chunks are the answer
+            if not isinstance(message_chunk, AIMessageChunk):
+                continue
+            if not message_chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield message_chunk.content
+
+        end = time.perf_counter()
+        final_values = self.state_graph.get_state(thread).values
+        self.checkpointer.prune(project_path, self.keep_checkpoints)
+        self.remember_answer(question, query_embedding, project_path, language, final_values["response"],
+                             final_values["retrieved_files"], end - start)
+        self.last_stream_timings = {
+            "time_to_first_token_ms": ((first_token_at or end) - start) * 1000,
+            "total_ms": (end - start) * 1000,
+        }
+        logging.info(f"Streamed answer: first token after {self.last_stream_timings['time_to_first_token_ms']:.0f} ms, "
+                     f"total {self.last_stream_timings['total_ms']:.0f} ms")
+
+    def prepared_answer(self, query: str, history: list, project_path: str, language: str) -> tuple:
+        """Answer from the symbol index or the answer cache where possible.
+
+        Returns the answer (or None), the standalone question and its embedding. A follow-up's answer depends on
+        the conversation, so the answer cache is searched with the question rewritten to stand alone.
+        """
+        structural_response = self.structural_answer(query, project_path)
+        if structural_response is not None:
+            return structural_response, query, None
+        question = self.ai_handler.standalone_question(query, history)
+        cached_response, query_embedding = self.cached_answer(question, project_path, language)
+        return cached_response, question, query_embedding
+
+    def structural_answer(self, query: str, project_path: str) -> str | None:
+        """Answer where-defined, what-uses and list-modules questions from the symbol index, skipping the LLM."""
+        with metrics.span("structural_query"):
+            response = answer_structural_query(query, self.ai_handler.chroma_db.symbol_index, project_path)
+        if response is not None:
+            metrics.increment("structural_answers")
         return response
+
+    def cached_answer(self, query: str, project_path: str, language: str) -> tuple:
+        """Look the query up in the answer cache, returning the cached answer (or None) and the query embedding."""
+        manifest = self.ai_handler.chroma_db.get_manifest(project_path, language)
+        query_embedding = self.ai_handler.chroma_db.embedding_function.embed_query(query)
+        project_key = answer_cache_key(project_path, language, self.ai_handler.model_name)
+        with metrics.span("answer_cache_lookup"):
+            cached_response = self.answer_cache.lookup(project_key, query_embedding, manifest)
+        metrics.increment("answer_cache_hits" if cached_response is not None else "answer_cache_misses")
+        return cached_response, query_embedding
+
+    def remember_answer(self, query: str, query_embedding: list, project_path: str, language: str, response: str,
+                        retrieved_files: list, generation_seconds: float):
+        manifest = self.ai_handler.chroma_db.get_manifest(project_path, language)
+        project_key = answer_cache_key(project_path, language, self.ai_handler.model_name)
+        self.answer_cache.store(project_key, query, query_embedding, response,
+                                {document.metadata["id"] for document in retrieved_files}, manifest,
+                                generation_seconds)
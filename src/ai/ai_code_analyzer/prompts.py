@@ -1,4 +1,4 @@
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 
 
 def query_prompt(query: str) -> str:
@@ -17,12 +17,11 @@ def supporting_code_prompt(combined_files_content: str) -> str:
     )
 
 
-def summary_prompt(previous_entry: str, new_entry: str, acceptable_size: int):
+def segment_summary_prompt(content: str, acceptable_size: int):
     return (
-        f"The following is a summary task. First, summarize the 'Previous Entry' section. "
-        f"Then incorporate key points from the 'New Entry' to produce a combined, concise summary."
-        f"Previous Entry:\n{previous_entry}\n\nNew Entry:\n{new_entry}"
-        f"\n Please condense the summary to be more concise."
+        f"The following is a summary task. Summarize this part of a conversation about a code project, "
+        f"keeping the questions asked, the decisions made and the key facts about the code."
+        f"\n{content}\n"
         f"The content must have up to {acceptable_size} letters"
         f"Do not add the code to the summary"
     )
@@ -38,6 +37,9 @@ def system_prompt() -> ChatPromptTemplate:
         "answer."
         "If the context is insufficient for a detailed summary, skip the summary and go directly to the answer."
         "\n\n"
+        "Project map (modules and their top-level definitions):\n"
+        "{project_map}"
+        "\n\n"
         "{context}"
     )
 
@@ -49,6 +51,12 @@ def system_prompt() -> ChatPromptTemplate:
     )
 
 
+def document_prompt() -> PromptTemplate:
+    return PromptTemplate.from_template(
+        "File: {id} ({symbol}, lines {start_line}-{end_line})\n{page_content}"
+    )
+
+
 def contextualize_q_prompt() -> ChatPromptTemplate:
     prompt = (
         "Given a chat history and the latest user question "
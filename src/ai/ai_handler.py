@@ -2,16 +2,22 @@ import os
 
 from dotenv import load_dotenv
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains.history_aware_retriever import create_history_aware_retriever
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain_community.chat_models import ChatOpenAI
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langchain_ollama import ChatOllama
 
-from src.ai.ai_code_analyzer.prompts import system_prompt, contextualize_q_prompt
-from src.database.chromadb_manager import ChromaDBManager
+from src.ai.ai_code_analyzer.prompts import system_prompt, contextualize_q_prompt, document_prompt
+from src.ai.context_packer import ContextPacker, token_budget
+from src.ai.hybrid_retriever import CANDIDATE_K, HybridRetriever
+from src.database.chromadb_manager import get_chroma_db
+from src.database.question_cache import question_cache_key
+from src.util.metrics import MetricsCallbackHandler, metrics
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+CONTEXTUALIZE_TAG = "contextualize_question"
 
 
 def create_llm(model_name, model_type, temperature):
@@ -27,17 +33,62 @@ def create_llm(model_name, model_type, temperature):
 
 
 class AiHandler:
-    def __init__(self, model_name, model_type, temperature=0.2, project_path=""):
-        """Initialize the appropriate LLM for chat."""
-        self.llm = create_llm(model_name, model_type, temperature)
-        self.chroma_db = ChromaDBManager()
-        self.question_answer_chain = create_stuff_documents_chain(self.llm, system_prompt())
-        self.retriever = self.chroma_db.vectorstore.as_retriever(
-            search_kwargs={'filter': {'project_path': project_path}, 'k': 20})
-        self.history_aware_retriever = create_history_aware_retriever(self.llm,
-                                                                      self.retriever,
-                                                                      contextualize_q_prompt())
-        self.rag_chain = create_retrieval_chain(self.history_aware_retriever, self.question_answer_chain)
+    def __init__(self, model_name, model_type, temperature=0.2, project_path="", chroma_db=None, llm=None):
+        """Initialize the appropriate LLM for chat, optionally sharing an existing ChromaDBManager or LLM."""
+        self.model_name = model_name
+        self.llm = llm or create_llm(model_name, model_type, temperature)
+        self.chroma_db = chroma_db or get_chroma_db()
+        self.question_answer_chain = create_stuff_documents_chain(self.llm, system_prompt(),
+                                                                  document_prompt=document_prompt())
+        # every fused candidate goes to the packer, which decides how many fit the model's token budget
+        self.retriever = HybridRetriever(collection=self.chroma_db.collection_for(project_path),
+                                         embeddings=self.chroma_db.embedding_function,
+                                         lexical_index=self.chroma_db.lexical_index,
+                                         project_path=project_path, k=CANDIDATE_K)
+        # tagged so token streaming can tell the question rewrite apart from the answer
+        self.contextualize_chain = (
+                contextualize_q_prompt() | self.llm.with_config(tags=[CONTEXTUALIZE_TAG]) | StrOutputParser())
+        self.context_packer = ContextPacker(token_budget(model_name))
+        # times retrieval and every LLM call of the chain, including the question rewrite
+        self.rag_chain = create_retrieval_chain(
+            RunnableLambda(self.retrieve_context), self.question_answer_chain
+        ).with_config(callbacks=[MetricsCallbackHandler(CONTEXTUALIZE_TAG)])
+
+    def contextualize_question(self, inputs: dict, config) -> str:
+        """Rewrite a follow-up into a standalone question, reusing earlier rewrites of the same history and query.
+
+        Without chat history the question already stands alone, so no LLM call is made.
+        """
+        chat_history = inputs.get("chat_history") or []
+        if not chat_history:
+            metrics.increment("question_rewrites_skipped")
+            return inputs["input"]
+
+        question_cache = self.chroma_db.question_cache
+        key = question_cache_key(self.model_name, chat_history, inputs["input"])
+        question = question_cache.lookup(key)
+        if question is not None:
+            metrics.increment("question_rewrite_cache_hits")
+            return question
+
+        question = self.contextualize_chain.invoke(inputs, config)
+        question_cache.store(key, question)
+        return question
+
+    def standalone_question(self, query: str, chat_history: list) -> str:
+        """Contextualize a query outside the RAG chain, timed like the chain's own rewrite."""
+        return self.contextualize_question({"input": query, "chat_history": chat_history},
+                                           {"callbacks": [MetricsCallbackHandler(CONTEXTUALIZE_TAG)]})
+
+    def retrieve_context(self, inputs: dict, config) -> list:
+        """Retrieve chunks for the (contextualized) question and pack them into the model's token budget.
+
+        A caller that already rewrote the question passes it as standalone_question, so it is not rewritten again.
+        """
+        question = inputs.get("standalone_question") or self.contextualize_question(inputs, config)
+        documents = self.retriever.invoke(question, config)
+        with metrics.span("context_packing"):
+            return self.context_packer.pack(inputs["input"], documents)
 
     # def retrieve_documents(self, query):
     #     """Retrieve documents and log queried files"""
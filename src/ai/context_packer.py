@@ -0,0 +1,107 @@
+import logging
+import os
+
+from langchain_core.documents import Document
+
+from src.database.lexical_index import identifier_terms
+from src.util.metrics import metrics
+from src.util.utils import estimate_tokens
+
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o": 12000,
+    "gpt-4o-mini": 12000,
+    "llama3.2": 4000,
+}
+DEFAULT_TOKEN_BUDGET = 6000
+# a single document may take at most this share of the budget before it is truncated
+MAX_DOCUMENT_SHARE = 0.3
+MIN_DOCUMENT_TOKENS = 80
+MAX_CHUNKS_PER_FILE = 3
+# the "File: ... (symbol, lines a-b)" header document_prompt() adds to each document
+DOCUMENT_HEADER_TOKENS = 20
+NAME_MATCH_WEIGHT = 1.0
+BODY_MATCH_WEIGHT = 0.5
+
+
+def token_budget(model_name: str) -> int:
+    return MODEL_TOKEN_BUDGETS.get(model_name, DEFAULT_TOKEN_BUDGET)
+
+
+def document_tokens(document: Document) -> int:
+    return estimate_tokens(document.page_content) + DOCUMENT_HEADER_TOKENS
+
+
+class ContextPacker:
+    """Assembles the prompt context from retrieved chunks within a token budget.
+
+    Chunks are deduplicated, reranked by how well their file, symbol and body match the question on top of
+    their retrieval rank, then added best first, truncating any chunk larger than its share of the budget.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, max_chunks_per_file: int = MAX_CHUNKS_PER_FILE):
+        self.token_budget = token_budget
+        self.max_chunks_per_file = max_chunks_per_file
+
+    def pack(self, query: str, documents: list) -> list:
+        """Return the documents to put in the prompt, best first, and record the tokens saved."""
+        packed, used_tokens = [], 0
+        for document in self.rerank(query, self.dedupe(documents)):
+            remaining = min(self.token_budget - used_tokens, int(self.token_budget * MAX_DOCUMENT_SHARE))
+            if remaining < MIN_DOCUMENT_TOKENS:
+                continue
+            document = self.truncate(document, remaining)
+            packed.append(document)
+            used_tokens += document_tokens(document)
+
+        retrieved_tokens = sum(document_tokens(document) for document in documents)
+        metrics.increment("context_tokens_packed", used_tokens)
+        metrics.increment("context_tokens_saved", retrieved_tokens - used_tokens)
+        logging.info(f"Packed {len(packed)} of {len(documents)} retrieved chunks into {used_tokens} tokens "
+                     f"(budget {self.token_budget}, saved {retrieved_tokens - used_tokens})")
+        return packed
+
+    def dedupe(self, documents: list) -> list:
+        """Drop repeated chunks and keep at most max_chunks_per_file chunks of any one file."""
+        seen, per_file, unique = set(), {}, []
+        for document in documents:
+            file_id = document.metadata.get("id")
+            key = (file_id, document.metadata.get("start_line"), document.page_content)
+            if key in seen or per_file.get(file_id, 0) >= self.max_chunks_per_file:
+                continue
+            seen.add(key)
+            per_file[file_id] = per_file.get(file_id, 0) + 1
+            unique.append(document)
+        return unique
+
+    @staticmethod
+    def rerank(query: str, documents: list) -> list:
+        query_terms = set(identifier_terms(query))
+        if not query_terms:
+            return documents
+
+        def score(ranked_document) -> float:
+            rank, document = ranked_document
+            names = f"{os.path.basename(document.metadata.get('id', ''))} {document.metadata.get('symbol', '')}"
+            name_overlap = len(query_terms & set(identifier_terms(names))) / len(query_terms)
+            body_overlap = len(query_terms & set(identifier_terms(document.page_content))) / len(query_terms)
+            return 1.0 / (rank + 1) + NAME_MATCH_WEIGHT * name_overlap + BODY_MATCH_WEIGHT * body_overlap
+
+        return [document for _, document in sorted(enumerate(documents), key=score, reverse=True)]
+
+    @staticmethod
+    def truncate(document: Document, max_tokens: int) -> Document:
+        """Keep the leading lines of a chunk that fit max_tokens, noting how many lines were cut."""
+        if document_tokens(document) <= max_tokens:
+            return document
+        lines = document.page_content.splitlines()
+        kept, kept_tokens = [], DOCUMENT_HEADER_TOKENS
+        for line in lines:
+            kept_tokens += estimate_tokens(line) + 1
+            if kept_tokens > max_tokens:
+                break
+            kept.append(line)
+
+        start_line = document.metadata.get("start_line", 1)
+        metadata = {**document.metadata, "end_line": start_line + max(len(kept), 1) - 1}
+        content = "\n".join(kept) + f"\n... ({len(lines) - len(kept)} more lines truncated)"
+        return Document(page_content=content, metadata=metadata)
@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from langchain.embeddings.base import Embeddings
+
+from src.util.metrics import metrics
+from src.util.utils import hash_content, parameter_chunks
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+QUERY_MEMORY_ENTRIES = 1024
+
+
+def encode_vector(vector) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def decode_vector(blob: bytes) -> list:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed on-disk cache in front of any LangChain Embeddings, with size-bounded LRU eviction.
+
+    Query vectors are also kept in a small in-process LRU, since the same query is embedded for the answer
+    cache and again for retrieval, and follow-ups repeat it.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_path: str,
+                 max_bytes: int = DEFAULT_MAX_BYTES, query_memory_entries: int = QUERY_MEMORY_ENTRIES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.query_memory_entries = query_memory_entries
+        self.query_vectors = OrderedDict()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, content_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL, PRIMARY KEY (model, content_hash))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def embed_documents(self, texts: list) -> list:
+        """Embed documents, computing only those whose content is not cached yet."""
+        return self.embed_cached(texts, self.model_name, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> list:
+        """Embed a query, keyed apart from documents since some models embed the two differently."""
+        content_hash = hash_content(text)
+        with self.lock:
+            if content_hash in self.query_vectors:
+                self.query_vectors.move_to_end(content_hash)
+                self.hits += 1
+                self.memory_hits += 1
+                metrics.increment("embedding_cache_hits")
+                return self.query_vectors[content_hash]
+
+        vector = self.embed_cached([text], f"{self.model_name}#query",
+                                   lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+        self.remember_queries({content_hash: vector})
+        return vector
+
+    def embed_queries(self, texts: list) -> list:
+        """Embed many queries through the batched document path, caching them as queries.
+
+        Only valid for models that embed queries and documents alike, as the Ollama embeddings used here do.
+        """
+        vectors = self.embed_cached(texts, f"{self.model_name}#query", self.embeddings.embed_documents)
+        self.remember_queries({hash_content(text): vector for text, vector in zip(texts, vectors)})
+        return vectors
+
+    def remember_queries(self, vectors: dict):
+        with self.lock:
+            for content_hash, vector in vectors.items():
+                self.query_vectors[content_hash] = vector
+                self.query_vectors.move_to_end(content_hash)
+            while len(self.query_vectors) > self.query_memory_entries:
+                self.query_vectors.popitem(last=False)
+
+    def embed_cached(self, texts: list, model: str, embed) -> list:
+        hashes = [hash_content(text) for text in texts]
+        vectors = self.lookup(model, set(hashes))
+        missing = {content_hash: text for content_hash, text in zip(hashes, texts) if content_hash not in vectors}
+
+        if missing:
+            with metrics.span("embedding"):
+                computed = embed(list(missing.values()))
+            new_vectors = {content_hash: [float(value) for value in vector]
+                           for content_hash, vector in zip(missing, computed)}
+            self.store(model, new_vectors)
+            vectors.update(new_vectors)
+
+        with self.lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        metrics.increment("embeddings_computed", len(missing))
+        metrics.increment("embedding_cache_hits", len(texts) - len(missing))
+        return [vectors[content_hash] for content_hash in hashes]
+
+    def lookup(self, model: str, hashes: set) -> dict:
+        """Fetch cached vectors for the given hashes and refresh their LRU timestamp."""
+        if not hashes:
+            return {}
+        found = {}
+        with self.lock:
+            for chunk, placeholders in parameter_chunks(list(hashes)):
+                rows = self.connection.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                found.update({content_hash: decode_vector(blob) for content_hash, blob in rows})
+            if found:
+                now = time.time()
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND content_hash = ?",
+                    [(now, model, content_hash) for content_hash in found],
+                )
+                self.connection.commit()
+        return found
+
+    def store(self, model: str, vectors: dict):
+        """Insert new vectors and evict the least recently used entries beyond the size bound."""
+        now = time.time()
+        with self.lock:
+            for content_hash, vector in vectors.items():
+                blob = encode_vector(vector)
+                previous = self.connection.execute(
+                    "SELECT size FROM embeddings WHERE model = ? AND content_hash = ?", (model, content_hash)).fetchone()
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, content_hash, vector, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (model, content_hash, blob, len(blob), now),
+                )
+                self.total_bytes += len(blob) - (previous[0] if previous else 0)
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes:
+            oldest = self.connection.execute(
+                "SELECT model, content_hash, size FROM embeddings ORDER BY last_access LIMIT 256").fetchall()
+            if not oldest:
+                break
+            for model, content_hash, size in oldest:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.connection.execute(
+                    "DELETE FROM embeddings WHERE model = ? AND content_hash = ?", (model, content_hash))
+                self.total_bytes -= size
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current cache footprint."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self.total_bytes,
+                "memory_queries": len(self.query_vectors),
+            }
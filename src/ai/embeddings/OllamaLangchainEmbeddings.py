@@ -1,3 +1,6 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Sequence
 
 from chromadb.utils.embedding_functions.ollama_embedding_function import OllamaEmbeddingFunction
@@ -7,13 +10,40 @@ from langchain.embeddings.base import Embeddings
 class OllamaLangchainEmbeddings(Embeddings):
     """Wrapper to adapt OllamaEmbeddingFunction to LangChain's Embeddings interface."""
 
-    def __init__(self, model_name: str, url: str):
+    def __init__(self, model_name: str, url: str, batch_size: int = 16, max_workers: int = 4,
+                 max_retries: int = 3, backoff_seconds: float = 0.5):
+        self.model_name = model_name
         self.ollama_embedding = OllamaEmbeddingFunction(model_name=model_name, url=url)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
 
     def embed_query(self, text: str) -> Sequence[float] | Sequence[int]:
         """Generate embedding for a single query."""
-        return self.ollama_embedding([text])[0]
+        return self.embed_batch([text])[0]
 
     def embed_documents(self, texts: list) -> list:
-        """Generate embeddings for a list of documents."""
-        return [self.ollama_embedding([doc])[0] for doc in texts]
+        """Generate embeddings for a list of documents, embedding batches concurrently."""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.max_workers <= 1:
+            return [embedding for batch in batches for embedding in self.embed_batch(batch)]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            results = executor.map(self.embed_batch, batches)
+            return [embedding for batch in results for embedding in batch]
+
+    def embed_batch(self, texts: list) -> list:
+        """Embed one batch, retrying with exponential backoff on failures or incomplete responses."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                embeddings = self.ollama_embedding(texts)
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+                return embeddings
+            except Exception as error:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt
+                logging.warning(f"Embedding batch failed ({error}), retrying in {delay:.1f}s")
+                time.sleep(delay)
@@ -0,0 +1,75 @@
+from itertools import zip_longest
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+RETRIEVAL_K = 8
+CANDIDATE_K = 20
+RRF_CONSTANT = 60
+# exact name matches go first, but at most this many per name and this share of k, leaving room for fused results
+MAX_EXACT_PER_NAME = 2
+MAX_EXACT_SHARE = 0.5
+
+
+def reciprocal_rank_fusion(rankings: list) -> list:
+    """Merge ranked id lists, scoring each id by the sum of 1 / (RRF_CONSTANT + rank) over the lists."""
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_CONSTANT + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def interleave_exact_matches(matches: dict, fused_ids: list, limit: int) -> list:
+    """Take the best fused-ranked chunks of each named file or symbol in turn, so no single name fills the
+    slots, up to MAX_EXACT_PER_NAME per name and limit overall."""
+    fused_rank = {chunk_id: rank for rank, chunk_id in enumerate(fused_ids)}
+    per_name = [sorted(chunk_ids, key=lambda chunk_id: fused_rank.get(chunk_id, len(fused_rank)))[:MAX_EXACT_PER_NAME]
+                for chunk_ids in matches.values()]
+    selected = []
+    for round_ids in zip_longest(*per_name):
+        selected.extend(chunk_id for chunk_id in round_ids if chunk_id is not None and chunk_id not in selected)
+    return selected[:limit]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retrieves project chunks by fusing vector similarity with BM25 over identifiers.
+
+    Chunks whose file or symbol the query names exactly come first, a few per name, so a small k still includes
+    every named file or symbol without one of them crowding out the rest.
+    """
+
+    collection: Any
+    embeddings: Any
+    lexical_index: Any
+    project_path: str
+    k: int = RETRIEVAL_K
+    candidate_k: int = CANDIDATE_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list:
+        exact_matches = self.lexical_index.exact_matches(self.project_path, query, self.candidate_k)
+        lexical_ids = self.lexical_index.search(self.project_path, query, self.candidate_k)
+        vector_results = self.collection.query(
+            query_embeddings=[self.embeddings.embed_query(query)], n_results=self.candidate_k,
+            where={"project_path": self.project_path}, include=["documents", "metadatas"])
+
+        documents = {
+            chunk_id: Document(page_content=content, metadata=metadata or {})
+            for chunk_id, content, metadata in zip(vector_results["ids"][0], vector_results["documents"][0],
+                                                   vector_results["metadatas"][0])
+        }
+        fused_ids = reciprocal_rank_fusion([list(documents), lexical_ids])
+        exact_ids = interleave_exact_matches(exact_matches, fused_ids, max(1, int(self.k * MAX_EXACT_SHARE)))
+        ranked_ids = list(dict.fromkeys(exact_ids + fused_ids))
+        selected_ids = ranked_ids[:self.k]
+
+        missing_ids = [chunk_id for chunk_id in selected_ids if chunk_id not in documents]
+        if missing_ids:
+            fetched = self.collection.get(ids=missing_ids, include=["documents", "metadatas"])
+            documents.update({
+                chunk_id: Document(page_content=content, metadata=metadata or {})
+                for chunk_id, content, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+            })
+        return [documents[chunk_id] for chunk_id in selected_ids if chunk_id in documents]
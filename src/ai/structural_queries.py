@@ -0,0 +1,74 @@
+import os
+import re
+
+from src.database.symbol_index import SymbolIndex
+
+NAME = r"`?([A-Za-z_][\w.]*?)`?"
+KIND = r"(?:the\s+)?(?:class|function|method|interface|enum|module)?\s*"
+WHERE_DEFINED_RE = re.compile(
+    rf"^\s*(?:where\s+(?:is|are)\s+{KIND}{NAME}\s+(?:defined|declared|implemented)"
+    rf"|(?:find|show)\s+(?:me\s+)?(?:the\s+)?definition\s+of\s+{KIND}{NAME})\s*\??\s*$", re.IGNORECASE)
+USERS_RE = re.compile(
+    rf"^\s*(?:which|what)\s+(?:classes|files|modules|functions)\s+(?:use|import|call|reference|depend\s+on)s?\s+"
+    rf"{KIND}{NAME}\s*\??\s*$", re.IGNORECASE)
+LIST_RE = re.compile(
+    r"^\s*(?:list|show)\s+(?:me\s+)?(?:all\s+)?(?:the\s+)?(modules|files|classes)"
+    r"(?:\s+(?:in|of)\s+(?:the|this)\s+project)?\s*\??\s*$", re.IGNORECASE)
+MAX_LISTED = 200
+
+
+def answer_structural_query(query: str, symbol_index: SymbolIndex, project_path: str) -> str | None:
+    """Answer questions about where symbols are defined, what uses them or which modules exist from the symbol
+    index alone. Returns None for any other question, or when the index knows nothing about the symbol, so it
+    goes to the LLM instead."""
+    if match := WHERE_DEFINED_RE.match(query):
+        return where_defined(symbol_index, project_path, match.group(1) or match.group(2))
+    if match := USERS_RE.match(query):
+        return users_of(symbol_index, project_path, match.group(1))
+    if match := LIST_RE.match(query):
+        return list_modules(symbol_index, project_path, classes_only=match.group(1).lower() == "classes")
+    return None
+
+
+def where_defined(symbol_index: SymbolIndex, project_path: str, name: str) -> str | None:
+    definitions = symbol_index.definitions_of(project_path, name)
+    if not definitions:
+        return None
+    lines = [f"- `{relative(project_path, file_path)}` line {line}: {kind} `{qualified_name}`"
+             for qualified_name, kind, file_path, line in definitions]
+    return f"`{name}` is defined in:\n" + "\n".join(lines)
+
+
+def users_of(symbol_index: SymbolIndex, project_path: str, name: str) -> str | None:
+    users = symbol_index.users_of(project_path, name)
+    if not users:
+        if symbol_index.definitions_of(project_path, name):
+            return f"No other files in the project import or reference `{name}`."
+        return None
+    lines = [f"- `{relative(project_path, file_path)}`" + (f": {', '.join(names)}" if names else "")
+             for file_path, names in users]
+    return f"`{name}` is imported or referenced by {len(users)} files:\n" + limited(lines)
+
+
+def list_modules(symbol_index: SymbolIndex, project_path: str, classes_only: bool) -> str | None:
+    if classes_only:
+        types = symbol_index.types(project_path)
+        if not types:
+            return None
+        lines = [f"- {kind} `{name}` in `{relative(project_path, file_path)}`" for name, kind, file_path in types]
+        return f"The project defines {len(types)} classes and other types:\n" + limited(lines)
+    modules = symbol_index.modules(project_path)
+    if not modules:
+        return None
+    lines = [f"- `{module}`" + (f": {', '.join(names)}" if names else "") for module, _, names in modules]
+    return f"The project has {len(modules)} modules:\n" + limited(lines)
+
+
+def relative(project_path: str, file_path: str) -> str:
+    return os.path.relpath(file_path, project_path).replace(os.sep, "/")
+
+
+def limited(lines: list) -> str:
+    if len(lines) > MAX_LISTED:
+        return "\n".join(lines[:MAX_LISTED] + [f"- ... and {len(lines) - MAX_LISTED} more"])
+    return "\n".join(lines)
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from src.database.index_manifest import IndexManifest
+from src.util.utils import hash_project_path
+
+SIMILARITY_THRESHOLD = 0.95
+TTL_SECONDS = 7 * 24 * 60 * 60
+MAX_ENTRIES = 2000
+
+
+def answer_cache_key(project_path: str, language: str, model_name: str) -> str:
+    """Key answers by project, language and the model that generated them, since analyzers share one cache."""
+    return f"{hash_project_path(project_path)}_{language}_{model_name}"
+
+
+class AnswerCache:
+    """On-disk cache of generated answers, matched by query embedding similarity within a project.
+
+    An entry stays valid while every file it was answered from keeps the content hash recorded at the time,
+    checked against the project's index manifest.
+    """
+
+    def __init__(self, cache_path: str, similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 ttl_seconds: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, project_key TEXT NOT NULL, index_revision TEXT, "
+            "query TEXT NOT NULL, embedding BLOB NOT NULL, answer TEXT NOT NULL, sources TEXT NOT NULL, "
+            "generation_seconds REAL NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_answers_project_key ON answers (project_key)")
+        self.connection.commit()
+
+    def lookup(self, project_key: str, query_embedding: list, manifest: IndexManifest) -> str | None:
+        """Return the answer of the most similar still-valid cached query, or None on a miss."""
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        with self.lock:
+            self.connection.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            rows = self.connection.execute(
+                "SELECT id, index_revision, embedding, answer, sources, generation_seconds "
+                "FROM answers WHERE project_key = ?", (project_key,)).fetchall()
+
+            candidates = []
+            if rows:
+                embeddings = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+                similarities = embeddings @ query_vector / (
+                    np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vector) + 1e-12)
+                candidates = sorted(
+                    ((similarity, row) for similarity, row in zip(similarities, rows)
+                     if similarity >= self.similarity_threshold),
+                    key=lambda candidate: candidate[0], reverse=True)
+
+            for similarity, (entry_id, revision, _, answer, sources, generation_seconds) in candidates:
+                if revision != manifest.revision and not self.sources_unchanged(json.loads(sources), manifest):
+                    self.connection.execute("DELETE FROM answers WHERE id = ?", (entry_id,))
+                    continue
+                self.connection.execute("UPDATE answers SET last_access = ?, index_revision = ? WHERE id = ?",
+                                        (time.time(), manifest.revision, entry_id))
+                self.connection.commit()
+                self.hits += 1
+                self.saved_seconds += generation_seconds
+                logging.info(f"Answer cache hit (similarity {similarity:.3f}), saved ~{generation_seconds:.1f}s")
+                return answer
+
+            self.connection.commit()
+            self.misses += 1
+            return None
+
+    @staticmethod
+    def sources_unchanged(sources: dict, manifest: IndexManifest) -> bool:
+        return all(manifest.file_hash(file_path) == content_hash for file_path, content_hash in sources.items())
+
+    def store(self, project_key: str, query: str, query_embedding: list, answer: str, source_files: set,
+              manifest: IndexManifest, generation_seconds: float):
+        """Remember an answer with the content hashes of the files it was generated from."""
+        sources = {file_path: manifest.file_hash(file_path) for file_path in source_files}
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO answers (project_key, index_revision, query, embedding, answer, sources, "
+                "generation_seconds, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (project_key, manifest.revision, query, np.asarray(query_embedding, dtype=np.float32).tobytes(),
+                 answer, json.dumps(sources), generation_seconds, now, now),
+            )
+            self.connection.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+            self.connection.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+import threading
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+KEEP_CHECKPOINTS = 2
+
+
+class PrunedSqliteSaver(SqliteSaver):
+    """SQLite checkpointer that can drop all but the latest checkpoints of a thread.
+
+    Each checkpoint holds the thread's full state, so older ones are only needed for time travel, which the
+    analyzers never use; pruning keeps the database at a bounded size per thread.
+    """
+
+    def prune(self, thread_id: str, keep: int = KEEP_CHECKPOINTS):
+        with self.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id NOT IN ("
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? ORDER BY checkpoint_id DESC LIMIT ?)",
+                (thread_id, thread_id, keep))
+            cursor.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_id NOT IN ("
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?)",
+                (thread_id, thread_id))
+
+
+checkpointers = {}
+checkpointers_lock = threading.Lock()
+
+
+def get_checkpointer(checkpoint_path: str) -> PrunedSqliteSaver:
+    """Return the process-wide checkpointer for a database file, so all analyzers write through one connection."""
+    key = os.path.abspath(checkpoint_path)
+    with checkpointers_lock:
+        if key not in checkpointers:
+            os.makedirs(os.path.dirname(key), exist_ok=True)
+            checkpointers[key] = PrunedSqliteSaver(sqlite3.connect(key, check_same_thread=False))
+        return checkpointers[key]
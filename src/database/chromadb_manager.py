@@ -1,56 +1,307 @@
-from hashlib import md5
+import logging
+import os
+import threading
+import time
 
 import chromadb
 from langchain_community.vectorstores import Chroma
 
+from src.ai.embeddings.CachedEmbeddings import CachedEmbeddings
 from src.ai.embeddings.OllamaLangchainEmbeddings import OllamaLangchainEmbeddings
+from src.database.index_manifest import IndexManifest, manifest_path_for
+from src.database.lexical_index import LexicalIndex
+from src.database.question_cache import QuestionCache
+from src.database.symbol_index import SymbolIndex
+from src.domain.indexing_report import IndexingReport
+from src.util.code_chunker import chunk_file
 from src.util.file_reader import FileReader
+from src.util.file_watcher import ProjectWatcher
+from src.util.metrics import metrics
+from src.util.utils import hash_content, hash_project_path
+
+CHROMA_PATH = "../ollama"
+ANSWER_CACHE_PATH = os.path.join(CHROMA_PATH, "answer_cache.sqlite3")
+CHECKPOINT_PATH = os.path.join(CHROMA_PATH, "checkpoints.sqlite3")
+EMBEDDING_MODEL = "mxbai-embed-large"
+EMBEDDING_URL = "http://localhost:11434/api/embeddings"
+UPSERT_BATCH_SIZE = 128
+READ_WORKERS = 4
+SHARED_COLLECTION = "documents"
 
 
 class ChromaDBManager:
-    def __init__(self):
-        """Initialize ChromaDB with Ollama embedding functions through a LangChain wrapper."""
+    def __init__(self, chroma_path: str = CHROMA_PATH, embedding_url: str = EMBEDDING_URL,
+                 upsert_batch_size: int = UPSERT_BATCH_SIZE, per_project_collections: bool = False):
+        """Initialize ChromaDB with Ollama embedding functions through a LangChain wrapper.
+
+        With per_project_collections every project gets its own collection instead of sharing one filtered by
+        project_path metadata. The two layouts keep separate manifests so switching reindexes each project once.
+        """
+        self.per_project_collections = per_project_collections
+        self.manifest_dir = os.path.join(chroma_path, "project_manifests" if per_project_collections else "manifests")
+        self.upsert_batch_size = upsert_batch_size
+        self.index_locks = {}
+        self.index_locks_guard = threading.Lock()
+        self.watchers = {}
+        self.vectorstores = {}
+        self.manifests = {}
 
-        self.persistent_client = chromadb.PersistentClient(path="../ollama")
-        self.persistent_client.get_or_create_collection("documents")
+        self.persistent_client = chromadb.PersistentClient(path=chroma_path)
+        self.collection = self.persistent_client.get_or_create_collection(SHARED_COLLECTION)
 
-        self.embedding_function = OllamaLangchainEmbeddings(
-            model_name="mxbai-embed-large",
-            url="http://localhost:11434/api/embeddings"
+        self.embedding_function = CachedEmbeddings(
+            OllamaLangchainEmbeddings(
+                model_name=EMBEDDING_MODEL,
+                url=embedding_url
+            ),
+            model_name=EMBEDDING_MODEL,
+            cache_path=os.path.join(chroma_path, "embedding_cache.sqlite3")
         )
-        self.vectorstore = Chroma(client=self.persistent_client, collection_name="documents",
+        self.vectorstore = Chroma(client=self.persistent_client, collection_name=SHARED_COLLECTION,
                                   embedding_function=self.embedding_function)
+        self.lexical_index = LexicalIndex(os.path.join(chroma_path, "lexical_index.sqlite3"))
+        self.symbol_index = SymbolIndex(os.path.join(chroma_path, "symbol_index.sqlite3"))
+        self.question_cache = QuestionCache(os.path.join(chroma_path, "question_cache.sqlite3"))
 
-    def add_files_from_project_to_db(self, project_path: str, language: str):
-        """Add or update files from the project path to the database."""
-        reader = FileReader(project_path, language)
-        files_contents = reader.read_all_files()
+    def add_files_from_project_to_db(self, project_path: str, language: str) -> IndexingReport:
+        """Add, update or remove project files in the database, skipping files unchanged since the last run."""
+        reader = FileReader(project_path, language, max_workers=READ_WORKERS)
+        with self.index_lock(project_path, language), metrics.span("indexing"):
+            manifest = self.get_manifest(project_path, language).copy()
+            report = IndexingReport()
 
-        for file_path, content in files_contents.items():
-            existing_docs = self.vectorstore.similarity_search(content)
-
-            if existing_docs:
-                stored_content = existing_docs[0].page_content
-                if md5(stored_content.encode()).hexdigest() != md5(content.encode()).hexdigest():
-                    # logging.info(f"File '{file_path}' has been modified, updating...")
-                    existing_ids = [doc.metadata['id'] for doc in existing_docs]
-                    if file_path in existing_ids:
-                        self.vectorstore.delete(ids=[file_path])
-                    self.add_by_project_and_language(project_path, file_path, content, language)
-            else:
-                self.add_by_project_and_language(project_path, file_path, content, language)
+            if not manifest.entries:
+                # documents indexed without a current manifest have unknown ids, so start the project clean
+                self.delete_project_documents(project_path, language)
+
+            seen_files = self.index_files(project_path, language, reader, reader.iter_files(), manifest, report)
+            self.remove_files(project_path, manifest.files() - seen_files, manifest, report)
+            self.save_manifest(manifest)
+
+        logging.info(f"Indexed '{project_path}' ({language}): {report}")
+        logging.info(f"Embedding cache: {self.embedding_function.stats()}")
+        return report
+
+    def update_files_in_db(self, project_path: str, language: str, file_paths) -> IndexingReport:
+        """Reindex only the given files, removing those that were deleted or are no longer relevant."""
+        reader = FileReader(project_path, language, max_workers=READ_WORKERS)
+        with self.index_lock(project_path, language), metrics.span("indexing"):
+            manifest = self.get_manifest(project_path, language).copy()
+            report = IndexingReport()
+
+            existing = [path for path in file_paths if os.path.isfile(path) and reader.is_relevant(path)]
+            seen_files = self.index_files(project_path, language, reader, existing, manifest, report)
+            self.remove_files(project_path, (set(file_paths) - seen_files) & manifest.files(), manifest, report)
+            self.save_manifest(manifest)
+
+        logging.info(f"Reindexed {len(file_paths)} touched files in '{project_path}' ({language}): {report}")
+        return report
+
+    def collection_name(self, project_path: str) -> str:
+        if self.per_project_collections:
+            return f"{SHARED_COLLECTION}_{hash_project_path(project_path)}"
+        return SHARED_COLLECTION
+
+    def vectorstore_for(self, project_path: str) -> Chroma:
+        """Return the vector store holding the project's chunks, creating its collection on first use."""
+        name = self.collection_name(project_path)
+        if name == SHARED_COLLECTION:
+            return self.vectorstore
+        with self.index_locks_guard:
+            if name not in self.vectorstores:
+                self.vectorstores[name] = Chroma(client=self.persistent_client, collection_name=name,
+                                                 embedding_function=self.embedding_function)
+            return self.vectorstores[name]
+
+    def collection_for(self, project_path: str):
+        name = self.collection_name(project_path)
+        if name == SHARED_COLLECTION:
+            return self.collection
+        return self.persistent_client.get_or_create_collection(name)
+
+    def get_manifest(self, project_path: str, language: str) -> IndexManifest:
+        """Return the project's last saved manifest, only reading it again when the file changed on disk.
+
+        The returned manifest is shared and must not be modified; indexing updates a copy and saves it.
+        """
+        key = (project_path, language)
+        try:
+            mtime = os.stat(manifest_path_for(project_path, language, self.manifest_dir)).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self.index_locks_guard:
+            cached = self.manifests.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        manifest = IndexManifest(project_path, language, self.manifest_dir)
+        with self.index_locks_guard:
+            self.manifests[key] = (mtime, manifest)
+        return manifest
+
+    def save_manifest(self, manifest: IndexManifest):
+        manifest.save()
+        with self.index_locks_guard:
+            self.manifests[(manifest.project_path, manifest.language)] = (
+                os.stat(manifest.manifest_path).st_mtime_ns, manifest)
+
+    def index_lock(self, project_path: str, language: str) -> threading.Lock:
+        """Return the lock that serializes indexing runs sharing a project manifest."""
+        with self.index_locks_guard:
+            return self.index_locks.setdefault((project_path, language), threading.Lock())
+
+    def index_files(self, project_path: str, language: str, reader: FileReader, file_paths,
+                    manifest: IndexManifest, report: IndexingReport) -> set:
+        """Stream the given files through change detection and upsert the changed ones, returning all seen paths.
+
+        Files that turn out unreadable, like binary ones, are left out of the returned paths so they are removed.
+        """
+        seen_files = set()
+        file_stats = {}
+
+        def changed_files():
+            for file_path in file_paths:
+                if file_path in seen_files:
+                    continue
+                seen_files.add(file_path)
+                start = time.perf_counter()
+                stat = os.stat(file_path)
+                unchanged = manifest.is_unchanged(file_path, stat)
+                metrics.observe("change_detection", time.perf_counter() - start)
+                if unchanged:
+                    report.record("skipped", time.perf_counter() - start)
+                    continue
+                file_stats[file_path] = stat
+                yield file_path
+
+        pending = []
+        for file_path, content in reader.iter_file_contents(changed_files()):
+            start = time.perf_counter()
+            stat = file_stats.pop(file_path)
+            content_hash = hash_content(content)
+            entry = manifest.get(file_path)
+            metrics.observe("change_detection", time.perf_counter() - start)
+            if entry and entry["hash"] == content_hash:
+                manifest.update(file_path, stat, content_hash, entry["chunk_ids"])
+                report.record("skipped", time.perf_counter() - start)
+                continue
+
+            pending.append({
+                "file_path": file_path,
+                "content": content,
+                "stat": stat,
+                "hash": content_hash,
+                "outcome": "updated" if entry else "added",
+                "elapsed": time.perf_counter() - start,
+            })
+            if len(pending) >= self.upsert_batch_size:
+                self.index_pending_files(project_path, language, pending, manifest, report)
+                pending = []
+
+        if pending:
+            self.index_pending_files(project_path, language, pending, manifest, report)
+        # the reader yields nothing for files it could not read as text, which leaves their stat behind
+        return seen_files - set(file_stats)
+
+    def remove_files(self, project_path: str, removed_files: set, manifest: IndexManifest, report: IndexingReport):
+        """Purge the chunks of files that left the project and forget them in the manifest."""
+        if not removed_files:
+            return
+        start = time.perf_counter()
+        stale_ids = [chunk_id for file_path in removed_files for chunk_id in manifest.remove(file_path)]
+        if stale_ids:
+            self.vectorstore_for(project_path).delete(ids=stale_ids)
+            self.lexical_index.delete(stale_ids)
+        self.symbol_index.delete_files(project_path, list(removed_files))
+        share = (time.perf_counter() - start) / len(removed_files)
+        for _ in removed_files:
+            report.record("removed", share)
+
+    def watch_project(self, project_path: str, language: str):
+        """Keep the project's index live by reindexing touched files in the background."""
+        key = (project_path, language)
+        with self.index_locks_guard:
+            if key in self.watchers:
+                return
+            self.watchers[key] = ProjectWatcher(
+                FileReader(project_path, language, record_metrics=False),
+                on_change=lambda file_paths: self.update_files_in_db(project_path, language, file_paths),
+                indexed_files=lambda: self.get_manifest(project_path, language).files()
+            )
+        self.watchers[key].start()
+
+    def is_watching(self, project_path: str, language: str) -> bool:
+        return (project_path, language) in self.watchers
+
+    def stop_watching(self):
+        with self.index_locks_guard:
+            watchers, self.watchers = list(self.watchers.values()), {}
+        for watcher in watchers:
+            watcher.stop()
+
+    def index_pending_files(self, project_path: str, language: str, pending: list, manifest: IndexManifest,
+                            report: IndexingReport):
+        """Replace the chunks of a batch of new or modified files and record them in the manifest."""
+        start = time.perf_counter()
+        stale_ids = [chunk_id for file in pending if file["outcome"] == "updated"
+                     for chunk_id in manifest.get(file["file_path"])["chunk_ids"]]
+        if stale_ids:
+            self.vectorstore_for(project_path).delete(ids=stale_ids)
+            self.lexical_index.delete(stale_ids)
+        chunk_ids = self.add_files_by_project_and_language(
+            project_path, {file["file_path"]: file["content"] for file in pending}, language)
+        share = (time.perf_counter() - start) / len(pending)
+
+        for file in pending:
+            manifest.update(file["file_path"], file["stat"], file["hash"], chunk_ids[file["file_path"]])
+            report.record(file["outcome"], file["elapsed"] + share)
 
     def add_by_project_and_language(self, project_path: str, file_path: str, file_content: str, language: str):
-        """Add a single file to the ChromaDB along with its metadata."""
-        self.vectorstore.add_texts(
-            texts=[file_content],
-            metadatas=[{
-                "project_path": project_path,
-                "language": language,
-                "id": file_path
-            }]
-        )
-        # logging.info(f"File '{file_path}' added to ChromaDB with embedding.")
+        """Add a single file's chunks to the ChromaDB along with their metadata."""
+        return self.add_files_by_project_and_language(project_path, {file_path: file_content}, language)
+
+    def add_files_by_project_and_language(self, project_path: str, files_contents: dict, language: str) -> dict:
+        """Chunk several files and upsert all chunks to the ChromaDB in one call, returning chunk ids per file."""
+        texts, metadatas, ids = [], [], []
+        lexical_chunks = []
+        chunk_ids = {}
+        for file_path, content in files_contents.items():
+            chunk_ids[file_path] = []
+            for index, chunk in enumerate(chunk_file(file_path, content)):
+                chunk_id = f"{file_path}#{index}"
+                chunk_ids[file_path].append(chunk_id)
+                ids.append(chunk_id)
+                texts.append(chunk.content)
+                metadatas.append({
+                    "project_path": project_path,
+                    "language": language,
+                    "id": file_path,
+                    "symbol": chunk.symbol,
+                    "start_line": chunk.start_line,
+                    "end_line": chunk.end_line
+                })
+                lexical_chunks.append((chunk_id, file_path, chunk.symbol, chunk.content))
+
+        with metrics.span("symbol_extraction"):
+            self.symbol_index.update(project_path, language, files_contents)
+        if texts:
+            with metrics.span("chroma_upsert"):
+                self.vectorstore_for(project_path).add_texts(texts=texts, metadatas=metadatas, ids=ids)
+            metrics.increment("chunks_upserted", len(texts))
+            self.lexical_index.add(project_path, language, lexical_chunks)
+        # logging.info(f"{len(ids)} chunks from {len(files_contents)} files added to ChromaDB with embedding.")
+        return chunk_ids
+
+    def delete_project_documents(self, project_path: str, language: str):
+        """Remove every document stored for the project and language."""
+        self.collection_for(project_path).delete(where={
+            "$and": [
+                {"project_path": {"$eq": project_path}},
+                {"language": {"$eq": language}}
+            ]
+        })
+        self.lexical_index.delete_project(project_path, language)
+        self.symbol_index.delete_project(project_path, language)
 
     def query_db(self, query_text: str, project_path: str, language: str):
         """Query ChromaDB with text and retrieve similar documents."""
@@ -63,10 +314,25 @@ class ChromaDBManager:
                     {"language": {"$eq": language}}
                 ]
             }
-            results = self.vectorstore.similarity_search(query_text, k=10, filter=filter_conditions)
+            results = self.vectorstore_for(project_path).similarity_search(query_text, k=10, filter=filter_conditions)
             unique_files = {result.metadata['id']: result for result in results}.values()
 
             return list(unique_files) if unique_files else None
         else:
             # logging.info(f"Embedding for query '{query_text}' is empty, skipping query.")
             return None
+
+
+chroma_dbs = {}
+chroma_dbs_lock = threading.Lock()
+
+
+def get_chroma_db(chroma_path: str = CHROMA_PATH, embedding_url: str = EMBEDDING_URL,
+                  per_project_collections: bool = False) -> ChromaDBManager:
+    """Return the process-wide manager for a store so every analyzer shares one client, cache and lock set."""
+    key = (os.path.abspath(chroma_path), embedding_url, per_project_collections)
+    with chroma_dbs_lock:
+        if key not in chroma_dbs:
+            chroma_dbs[key] = ChromaDBManager(chroma_path, embedding_url,
+                                              per_project_collections=per_project_collections)
+        return chroma_dbs[key]
@@ -0,0 +1,95 @@
+import copy
+import json
+import os
+import uuid
+
+from src.util.utils import hash_project_path
+
+# bumped whenever indexing changes in a way that needs every project to be indexed again
+MANIFEST_VERSION = 6
+
+
+def manifest_path_for(project_path: str, language: str, manifest_dir: str) -> str:
+    return os.path.join(manifest_dir, f"{hash_project_path(project_path)}_{language}.json")
+
+
+class IndexManifest:
+    """Persistent record of the files indexed for a project, used to skip unchanged files."""
+
+    def __init__(self, project_path: str, language: str, manifest_dir: str):
+        self.project_path = project_path
+        self.language = language
+        self.manifest_path = manifest_path_for(project_path, language, manifest_dir)
+        self.revision = None
+        self.changed = False
+        self.entries = self.load()
+
+    def load(self) -> dict:
+        """Load the manifest entries from disk, starting empty if none exist yet or the format changed."""
+        try:
+            with open(self.manifest_path, "r") as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        self.revision = data.get("revision")
+        return data.get("files", {})
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never leaves a corrupt file.
+
+        The revision changes whenever indexed content changed, so caches can tell whether the index moved on.
+        """
+        if self.changed or self.revision is None:
+            self.revision = uuid.uuid4().hex
+            self.changed = False
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "revision": self.revision,
+                "project_path": self.project_path,
+                "language": self.language,
+                "files": self.entries,
+            }, file)
+        os.replace(temp_path, self.manifest_path)
+
+    def copy(self) -> "IndexManifest":
+        """Return a copy to update, leaving this manifest untouched for concurrent readers."""
+        manifest = copy.copy(self)
+        manifest.entries = dict(self.entries)
+        return manifest
+
+    def get(self, file_path: str) -> dict | None:
+        return self.entries.get(file_path)
+
+    def is_unchanged(self, file_path: str, stat: os.stat_result) -> bool:
+        """Check whether the file's mtime and size still match the recorded entry."""
+        entry = self.entries.get(file_path)
+        return entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+
+    def update(self, file_path: str, stat: os.stat_result, content_hash: str, chunk_ids: list):
+        previous = self.entries.get(file_path)
+        if previous is None or previous["hash"] != content_hash:
+            self.changed = True
+        self.entries[file_path] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": content_hash,
+            "chunk_ids": chunk_ids,
+        }
+
+    def remove(self, file_path: str) -> list:
+        """Forget a file and return the ids of the chunks that were stored for it."""
+        entry = self.entries.pop(file_path, None)
+        self.changed = self.changed or entry is not None
+        return entry["chunk_ids"] if entry else []
+
+    def file_hash(self, file_path: str) -> str | None:
+        entry = self.entries.get(file_path)
+        return entry["hash"] if entry else None
+
+    def files(self) -> set:
+        return set(self.entries)
@@ -0,0 +1,142 @@
+import os
+import re
+import sqlite3
+import threading
+
+from src.util.utils import parameter_chunks
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+DEFINITION_RE = re.compile(r"\b(?:def|class|interface|enum|record)\s+([A-Za-z_][A-Za-z0-9_]*)")
+CAMEL_CASE_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+NAME_WEIGHT = 4.0
+BODY_WEIGHT = 1.0
+
+
+def identifier_terms(text: str) -> list:
+    """Split text into lowercase terms, keeping each whole identifier next to its snake and camel case parts."""
+    terms = []
+    for identifier in IDENTIFIER_RE.findall(text):
+        for name in identifier.split("."):
+            terms.append(name.lower())
+            parts = [part.lower() for piece in name.split("_") for part in CAMEL_CASE_RE.findall(piece)]
+            if len(parts) > 1:
+                terms.extend(parts)
+    return terms
+
+
+def chunk_names(file_path: str, symbol: str, content: str) -> set:
+    """Names a chunk can be asked for exactly: its file name with and without extension, its symbol parts and
+    the functions and types it defines."""
+    file_name = os.path.basename(file_path).lower()
+    names = {file_name, os.path.splitext(file_name)[0], symbol.lower()}
+    names.update(part for part in symbol.lower().split(".") if part)
+    names.update(name.lower() for name in DEFINITION_RE.findall(content))
+    return names
+
+
+def query_names(query: str) -> set:
+    """Tokens of a query that look like identifiers or file names rather than plain words."""
+    tokens = (token.strip(".") for token in re.findall(r"[\w.]+", query))
+    return {token.lower() for token in tokens
+            if re.search(r"[_.0-9]", token) or any(char.isupper() for char in token[1:])}
+
+
+class LexicalIndex:
+    """BM25 full-text index over code chunks, kept next to the Chroma collection and updated with it.
+
+    Chunks are indexed by their identifier terms in SQLite FTS5, with file and symbol names weighted above the
+    body, plus an exact name table so a query naming a file or symbol finds its chunks directly.
+    """
+
+    def __init__(self, index_path: str):
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, "
+            "project_path TEXT NOT NULL, language TEXT NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_chunks_project ON chunks (project_path, language)")
+        # underscores stay inside terms so whole snake_case identifiers remain searchable
+        self.connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms "
+            "USING fts5(names, body, tokenize=\"unicode61 tokenchars '_'\")"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS chunk_names (name TEXT NOT NULL, row INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_chunk_names_name ON chunk_names (name)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_chunk_names_row ON chunk_names (row)")
+        self.connection.commit()
+
+    def add(self, project_path: str, language: str, chunks: list):
+        """Index (chunk_id, file_path, symbol, content) tuples, replacing chunks that are already indexed."""
+        with self.lock:
+            self.delete_rows(self.rows_of([chunk[0] for chunk in chunks]))
+            for chunk_id, file_path, symbol, content in chunks:
+                row = self.connection.execute(
+                    "INSERT INTO chunks (chunk_id, project_path, language) VALUES (?, ?, ?)",
+                    (chunk_id, project_path, language)).lastrowid
+                names = chunk_names(file_path, symbol, content)
+                self.connection.execute(
+                    "INSERT INTO chunk_terms (rowid, names, body) VALUES (?, ?, ?)",
+                    (row, " ".join(identifier_terms(" ".join(names))), " ".join(identifier_terms(content))))
+                self.connection.executemany("INSERT INTO chunk_names (name, row) VALUES (?, ?)",
+                                            [(name, row) for name in names])
+            self.connection.commit()
+
+    def delete(self, chunk_ids: list):
+        with self.lock:
+            self.delete_rows(self.rows_of(chunk_ids))
+            self.connection.commit()
+
+    def delete_project(self, project_path: str, language: str):
+        with self.lock:
+            rows = [row for (row,) in self.connection.execute(
+                "SELECT row FROM chunks WHERE project_path = ? AND language = ?", (project_path, language))]
+            self.delete_rows(rows)
+            self.connection.commit()
+
+    def rows_of(self, chunk_ids: list) -> list:
+        rows = []
+        for chunk, placeholders in parameter_chunks(chunk_ids):
+            rows.extend(row for (row,) in self.connection.execute(
+                f"SELECT row FROM chunks WHERE chunk_id IN ({placeholders})", chunk))
+        return rows
+
+    def delete_rows(self, rows: list):
+        for chunk, placeholders in parameter_chunks(rows):
+            self.connection.execute(f"DELETE FROM chunk_terms WHERE rowid IN ({placeholders})", chunk)
+            self.connection.execute(f"DELETE FROM chunk_names WHERE row IN ({placeholders})", chunk)
+            self.connection.execute(f"DELETE FROM chunks WHERE row IN ({placeholders})", chunk)
+
+    def search(self, project_path: str, query: str, limit: int) -> list:
+        """Return the ids of the best BM25 matches for the query within the project, best first."""
+        terms = sorted(set(identifier_terms(query)))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self.lock:
+            return [chunk_id for (chunk_id,) in self.connection.execute(
+                "SELECT chunks.chunk_id FROM chunk_terms JOIN chunks ON chunks.row = chunk_terms.rowid "
+                "WHERE chunk_terms MATCH ? AND chunks.project_path = ? "
+                "ORDER BY bm25(chunk_terms, ?, ?) LIMIT ?",
+                (match, project_path, NAME_WEIGHT, BODY_WEIGHT, limit))]
+
+    def exact_matches(self, project_path: str, query: str, limit_per_name: int) -> dict:
+        """Return, per name the query mentions, the ids of chunks whose file or symbol has that name exactly."""
+        names = sorted(query_names(query))
+        if not names:
+            return {}
+        placeholders = ",".join("?" * len(names))
+        matches = {}
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, chunk_id FROM (SELECT chunk_names.name AS name, chunks.chunk_id AS chunk_id, "
+                "ROW_NUMBER() OVER (PARTITION BY chunk_names.name ORDER BY chunks.row) AS position "
+                "FROM chunk_names JOIN chunks ON chunks.row = chunk_names.row "
+                f"WHERE chunk_names.name IN ({placeholders}) AND chunks.project_path = ?) "
+                "WHERE position <= ? ORDER BY name, position",
+                (*names, project_path, limit_per_name)).fetchall()
+        for name, chunk_id in rows:
+            matches.setdefault(name, []).append(chunk_id)
+        return matches
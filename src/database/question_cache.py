@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.util.utils import hash_content
+
+MAX_ENTRIES = 5000
+MEMORY_ENTRIES = 512
+
+
+def question_cache_key(model_name: str, chat_history: list, query: str) -> str:
+    """Key a rewrite by the model, a digest of the chat history it was rewritten against and the query."""
+    history = json.dumps([(message.type, message.content) for message in chat_history], default=str)
+    return hash_content(f"{model_name}\n{hash_content(history)}\n{query}")
+
+
+class QuestionCache:
+    """Memo of contextualized (standalone) questions, in an in-process LRU backed by SQLite.
+
+    Rewriting a follow-up question costs an LLM call before retrieval can start; the same history and question
+    always rewrite the same way, so the result is reused across repeated queries and restarts.
+    """
+
+    def __init__(self, cache_path: str, max_entries: int = MAX_ENTRIES, memory_entries: int = MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "key TEXT PRIMARY KEY, question TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_questions_last_access ON questions (last_access)")
+        self.connection.commit()
+
+    def lookup(self, key: str) -> str | None:
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return self.memory[key]
+
+            row = self.connection.execute("SELECT question FROM questions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE questions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            self.remember(key, row[0])
+            self.hits += 1
+            return row[0]
+
+    def store(self, key: str, question: str):
+        """Remember a rewrite, evicting the least recently used entries beyond both bounds."""
+        with self.lock:
+            self.remember(key, question)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO questions (key, question, last_access) VALUES (?, ?, ?)",
+                (key, question, time.time()))
+            self.connection.execute(
+                "DELETE FROM questions WHERE key IN "
+                "(SELECT key FROM questions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+            self.connection.commit()
+
+    def remember(self, key: str, question: str):
+        self.memory[key] = question
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+            }
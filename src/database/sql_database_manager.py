@@ -1,10 +1,22 @@
-from sqlalchemy import Column, String, Text, Integer, create_engine
+import logging
+import queue
+import re
+import threading
+
+from sqlalchemy import Column, String, Text, Integer, Index, create_engine, event, insert, select, update
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from src.util.utils import hash_project_path
 
 Base = declarative_base()
 
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+WRITE_BATCH_SIZE = 100
+HISTORY_LIMIT = 50
+HASHED_PATH_RE = re.compile(r"^[0-9a-f]{32}$")
+
 
 class ChatContext(Base):
     __tablename__ = 'chat_context'
@@ -15,37 +27,109 @@ class ChatContext(Base):
     project_path = Column(String, nullable=False)
 
 
+project_history_index = Index("ix_chat_context_project_path_id", ChatContext.project_path, ChatContext.id)
+
+
+def enable_sqlite_wal(dbapi_connection, connection_record):
+    """Let readers proceed while the background writer commits."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 class DatabaseManager:
-    def __init__(self, db_url="sqlite:///queries.db"):
-        """Initialize the database manager and create a session."""
-        self.engine = create_engine(db_url)
-        Base.metadata.create_all(self.engine)
+    def __init__(self, db_url="sqlite:///queries.db", batch_size=WRITE_BATCH_SIZE):
+        """Initialize the database manager with a pooled engine and a background writer."""
+        if ":memory:" in db_url:
+            # an in-memory database exists per connection, so the writer thread must share the one connection
+            pool_options = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        else:
+            pool_options = {"pool_size": POOL_SIZE, "max_overflow": MAX_OVERFLOW}
+        self.engine = create_engine(db_url, **pool_options)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", enable_sqlite_wal)
+        self.create_table()
         self.Session = sessionmaker(bind=self.engine)
-        self.session = self.Session()
+
+        self.batch_size = batch_size
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_pending, daemon=True)
+        self.writer.start()
 
     def store_chat_context(self, question: str, response: str, project_path: str):
-        """Store chat context in the chat_context table."""
-        self.create_table()
-        chat_context = ChatContext(
-            question=question,
-            response=response,
-            project_path=project_path
-        )
-        self.session.add(chat_context)
-        self.session.commit()
-
-    def get_project_chat_context(self, project_path: str):
-        """Retrieve chat context for a specific project path."""
+        """Queue chat context for a batched insert into the chat_context table by the background writer."""
+        self.pending.put({
+            "question": question,
+            "response": response,
+            "project_path": hash_project_path(project_path)
+        })
+
+    def write_pending(self):
+        """Insert queued chat context in batches until close() sends the stop marker."""
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    with self.Session() as session:
+                        session.execute(insert(ChatContext), rows)
+                        session.commit()
+                except Exception:
+                    logging.exception(f"Failed to store {len(rows)} chat context rows")
+            for _ in batch:
+                self.pending.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def flush(self):
+        """Block until every queued chat context has been written."""
+        self.pending.join()
+
+    def get_project_chat_context(self, project_path: str, limit: int = HISTORY_LIMIT, before_id: int | None = None):
+        """Retrieve up to `limit` of the most recent chat context rows for a project, oldest first.
+
+        Pass the id of the oldest row received as `before_id` to page further back.
+        """
         hashed_project_path = hash_project_path(project_path)
-        return self.session.query(ChatContext).filter_by(project_path=hashed_project_path).all()
+        statement = select(ChatContext).where(ChatContext.project_path == hashed_project_path)
+        if before_id is not None:
+            statement = statement.where(ChatContext.id < before_id)
+        statement = statement.order_by(ChatContext.id.desc()).limit(limit)
+
+        with self.Session() as session:
+            rows = session.scalars(statement).all()
+        return list(reversed(rows))
 
     def create_table(self):
-        """Ensure the chat_context table exists."""
+        """Ensure the chat_context table and its project history index exist."""
         Base.metadata.create_all(self.engine)
+        project_history_index.create(self.engine, checkfirst=True)
+        self.hash_raw_project_paths()
+
+    def hash_raw_project_paths(self):
+        """Hash the project paths of rows stored as raw paths by earlier versions, so their history stays
+        reachable now that paths are hashed on write as well as on read."""
+        with self.engine.begin() as connection:
+            raw_paths = [project_path for project_path in connection.scalars(
+                select(ChatContext.project_path).distinct()) if not HASHED_PATH_RE.match(project_path)]
+            for project_path in raw_paths:
+                connection.execute(update(ChatContext).where(ChatContext.project_path == project_path)
+                                   .values(project_path=hash_project_path(project_path)))
+        if raw_paths:
+            logging.info(f"Hashed the stored project paths of {len(raw_paths)} projects in chat_context")
 
     def close(self):
-        """Close the session."""
-        self.session.close()
+        """Write out queued chat context, stop the writer and release pooled connections."""
+        self.pending.put(None)
+        self.writer.join()
+        self.engine.dispose()
 
 
 if __name__ == "__main__":
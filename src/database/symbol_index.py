@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+import threading
+
+from src.util.symbol_extractor import extract_symbols
+from src.util.utils import estimate_tokens, parameter_chunks
+
+PROJECT_MAP_TOKENS = 600
+TYPE_KINDS = ("class", "interface", "enum", "record")
+TOP_LEVEL_KINDS = TYPE_KINDS + ("function",)
+
+
+class SymbolIndex:
+    """Per-project symbol table and import/reference graph, extracted while indexing and kept in SQLite.
+
+    Answers structural questions (where is X defined, what uses X, which modules exist) without the LLM, and
+    renders a compact project map for the prompt.
+    """
+
+    def __init__(self, index_path: str):
+        self.lock = threading.Lock()
+        self.project_maps = {}
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS symbol_files (project_path TEXT NOT NULL, language TEXT NOT NULL, "
+            "file_path TEXT NOT NULL, module TEXT NOT NULL, imports TEXT NOT NULL, "
+            "PRIMARY KEY (project_path, file_path))"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS definitions (project_path TEXT NOT NULL, file_path TEXT NOT NULL, "
+            "name TEXT NOT NULL, short_name TEXT NOT NULL, kind TEXT NOT NULL, line INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_definitions_name ON definitions (project_path, short_name COLLATE NOCASE)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_definitions_file ON definitions (project_path, file_path)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS symbol_references (project_path TEXT NOT NULL, file_path TEXT NOT NULL, "
+            "name TEXT NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_references_name ON symbol_references (project_path, name COLLATE NOCASE)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_references_file ON symbol_references (project_path, file_path)")
+        self.connection.commit()
+
+    def update(self, project_path: str, language: str, files_contents: dict):
+        """Replace the symbols of the given files with those extracted from their current content."""
+        with self.lock:
+            self.delete_file_rows(project_path, list(files_contents))
+            for file_path, content in files_contents.items():
+                symbols = extract_symbols(project_path, file_path, content)
+                if symbols is None:
+                    continue
+                self.connection.execute(
+                    "INSERT INTO symbol_files (project_path, language, file_path, module, imports) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (project_path, language, file_path, symbols.module, json.dumps(symbols.imports)))
+                self.connection.executemany(
+                    "INSERT INTO definitions (project_path, file_path, name, short_name, kind, line) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(project_path, file_path, definition["name"], definition["name"].rsplit(".", 1)[-1],
+                      definition["kind"], definition["line"]) for definition in symbols.definitions])
+                # an import counts as a use of the imported name
+                used_names = set(symbols.references) | {name.rsplit(".", 1)[-1] for name in symbols.imports}
+                self.connection.executemany(
+                    "INSERT INTO symbol_references (project_path, file_path, name) VALUES (?, ?, ?)",
+                    [(project_path, file_path, name) for name in used_names])
+            self.project_maps.pop(project_path, None)
+            self.connection.commit()
+
+    def delete_files(self, project_path: str, file_paths: list):
+        with self.lock:
+            self.delete_file_rows(project_path, file_paths)
+            self.project_maps.pop(project_path, None)
+            self.connection.commit()
+
+    def delete_project(self, project_path: str, language: str):
+        with self.lock:
+            file_paths = [file_path for (file_path,) in self.connection.execute(
+                "SELECT file_path FROM symbol_files WHERE project_path = ? AND language = ?",
+                (project_path, language))]
+            self.delete_file_rows(project_path, file_paths)
+            self.project_maps.pop(project_path, None)
+            self.connection.commit()
+
+    def delete_file_rows(self, project_path: str, file_paths: list):
+        for chunk, placeholders in parameter_chunks(file_paths):
+            for table in ("symbol_files", "definitions", "symbol_references"):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE project_path = ? AND file_path IN ({placeholders})",
+                    (project_path, *chunk))
+
+    def definitions_of(self, project_path: str, name: str) -> list:
+        """Return (name, kind, file_path, line) of definitions named name; a qualified name like Class.name also
+        matches definitions nested deeper, like Outer.Class.name."""
+        short_name = name.rsplit(".", 1)[-1]
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, kind, file_path, line FROM definitions "
+                "WHERE project_path = ? AND short_name = ? COLLATE NOCASE ORDER BY file_path, line",
+                (project_path, short_name)).fetchall()
+        qualified_name = name.lower()
+        return [row for row in rows if "." not in name or row[0].lower() == qualified_name
+                or row[0].lower().endswith(f".{qualified_name}")]
+
+    def users_of(self, project_path: str, name: str) -> list:
+        """Return (file_path, [top-level definitions]) of files that import or reference name, except its own."""
+        short_name = name.rsplit(".", 1)[-1]
+        with self.lock:
+            defining_files = {file_path for (file_path,) in self.connection.execute(
+                "SELECT file_path FROM definitions WHERE project_path = ? AND short_name = ? COLLATE NOCASE",
+                (project_path, short_name))}
+            file_paths = [file_path for (file_path,) in self.connection.execute(
+                "SELECT DISTINCT file_path FROM symbol_references WHERE project_path = ? AND name = ? COLLATE NOCASE "
+                "ORDER BY file_path", (project_path, short_name))]
+            return [(file_path, self.top_level_names(project_path, file_path))
+                    for file_path in file_paths if file_path not in defining_files]
+
+    def modules(self, project_path: str) -> list:
+        """Return (module, file_path, [top-level definitions]) for every indexed file of the project."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT module, file_path FROM symbol_files WHERE project_path = ? ORDER BY module",
+                (project_path,)).fetchall()
+            return [(module, file_path, self.top_level_names(project_path, file_path)) for module, file_path in rows]
+
+    def types(self, project_path: str) -> list:
+        """Return (name, kind, file_path) of every class, interface, enum and record of the project."""
+        placeholders = ",".join("?" * len(TYPE_KINDS))
+        with self.lock:
+            return self.connection.execute(
+                f"SELECT name, kind, file_path FROM definitions WHERE project_path = ? AND kind IN ({placeholders}) "
+                "ORDER BY name", (project_path, *TYPE_KINDS)).fetchall()
+
+    def top_level_names(self, project_path: str, file_path: str) -> list:
+        placeholders = ",".join("?" * len(TOP_LEVEL_KINDS))
+        return [name for (name,) in self.connection.execute(
+            f"SELECT name FROM definitions WHERE project_path = ? AND file_path = ? AND kind IN ({placeholders}) "
+            "AND name NOT LIKE '%.%' ORDER BY line", (project_path, file_path, *TOP_LEVEL_KINDS))]
+
+    def project_map(self, project_path: str, max_tokens: int = PROJECT_MAP_TOKENS) -> str:
+        """Render one line per module with its top-level definitions, cut off at max_tokens."""
+        if project_path in self.project_maps:
+            return self.project_maps[project_path]
+        modules = self.modules(project_path)
+        lines, used_tokens = [], 0
+        for index, (module, _, names) in enumerate(modules):
+            line = f"{module}: {', '.join(names)}" if names else module
+            used_tokens += estimate_tokens(line) + 1
+            if used_tokens > max_tokens:
+                lines.append(f"... ({len(modules) - index} more modules)")
+                break
+            lines.append(line)
+        project_map = "\n".join(lines)
+        with self.lock:
+            self.project_maps[project_path] = project_map
+        return project_map
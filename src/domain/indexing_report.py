@@ -0,0 +1,20 @@
+from dataclasses import dataclass, field
+
+OUTCOMES = ("skipped", "updated", "added", "removed")
+
+
+@dataclass
+class IndexingReport:
+    """Counts and wall time per outcome of a single indexing run."""
+
+    counts: dict = field(default_factory=lambda: dict.fromkeys(OUTCOMES, 0))
+    timings: dict = field(default_factory=lambda: dict.fromkeys(OUTCOMES, 0.0))
+
+    def record(self, outcome: str, seconds: float):
+        self.counts[outcome] += 1
+        self.timings[outcome] += seconds
+
+    def __str__(self) -> str:
+        return ", ".join(
+            f"{outcome}: {self.counts[outcome]} ({self.timings[outcome]:.2f}s)" for outcome in OUTCOMES
+        )
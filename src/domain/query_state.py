@@ -8,6 +8,7 @@ from typing_extensions import Annotated
 
 class QueryState(TypedDict):
     query: str
+    standalone_question: str
     retrieved_files: List[Document]
     project_path: str
     messages: Annotated[list[AnyMessage], add_messages]
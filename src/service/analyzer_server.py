@@ -0,0 +1,216 @@
+"""Long-running analyzer service that keeps clients, compiled graphs and retrievers warm per project.
+
+Run from the repository root:
+    python -m src.service.analyzer_server --port 8765
+
+Then query it with:
+    curl -X POST localhost:8765/query -d '{"query": "...", "project_path": "...", "language": "python",
+                                          "model_type": "chatgpt", "model_name": "gpt-4o"}'
+
+Queries for different projects run in parallel on a bounded worker pool, all sharing one Chroma client; pass
+--collection-per-project to give every project its own collection.
+
+GET /stats returns cache and latency statistics as JSON, GET /metrics the per-stage metrics in the Prometheus
+text format.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.ai.ai_code_analyzer.ai_analyzer import AiProjectAnalyzer
+from src.database.answer_cache import AnswerCache
+from src.database.chromadb_manager import ANSWER_CACHE_PATH, get_chroma_db
+from src.util.metrics import metrics
+
+# queries mostly wait on the LLM and embedding servers, so run several per core
+QUERY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+class AnalyzerService:
+    """Caches one analyzer per project and model, answering from the current index while reindexing in the
+    background."""
+
+    def __init__(self, watch: bool = False, per_project_collections: bool = False, workers: int = QUERY_WORKERS):
+        self.chroma_db = get_chroma_db(per_project_collections=per_project_collections)
+        self.answer_cache = AnswerCache(ANSWER_CACHE_PATH)
+        self.watch = watch
+        self.query_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self.analyzers = {}
+        self.thread_locks = {}
+        self.creation_locks = {}
+        self.indexing_threads = {}
+        self.latencies = {"cold": [], "warm": []}
+        self.lock = threading.Lock()
+
+    def get_analyzer(self, project_path: str, model_type: str, model_name: str) -> tuple:
+        """Return the cached analyzer for the project and model, building it on first use.
+
+        Analyzers are built outside the service lock so a cold project does not hold up queries for others.
+        """
+        key = (project_path, model_type, model_name)
+        with self.lock:
+            if key in self.analyzers:
+                return self.analyzers[key], True
+            creation_lock = self.creation_locks.setdefault(key, threading.Lock())
+
+        with creation_lock:
+            with self.lock:
+                if key in self.analyzers:
+                    return self.analyzers[key], True
+            analyzer = AiProjectAnalyzer(project_path, model_type=model_type, model_name=model_name,
+                                         chroma_db=self.chroma_db, answer_cache=self.answer_cache)
+            with self.lock:
+                self.analyzers[key] = analyzer
+                return analyzer, False
+
+    def thread_lock(self, thread_id: str) -> threading.Lock:
+        """Return the lock serializing queries on one conversation thread, which analyzers of every model share
+        through the checkpointer."""
+        with self.lock:
+            return self.thread_locks.setdefault(thread_id, threading.Lock())
+
+    def ensure_index(self, project_path: str, language: str):
+        """Index a never-seen project synchronously, otherwise refresh it in the background.
+
+        In watch mode a project is only rescanned when its watcher starts; afterwards the watcher reindexes
+        touched files and queries never wait on indexing.
+        """
+        if self.chroma_db.is_watching(project_path, language):
+            return
+        if not self.chroma_db.get_manifest(project_path, language).entries:
+            self.chroma_db.add_files_from_project_to_db(project_path, language)
+            if self.watch:
+                self.chroma_db.watch_project(project_path, language)
+            return
+        if self.watch:
+            self.chroma_db.watch_project(project_path, language)
+
+        key = (project_path, language)
+        with self.lock:
+            running = self.indexing_threads.get(key)
+            if running and running.is_alive():
+                return
+            thread = threading.Thread(target=self.reindex, args=(project_path, language), daemon=True)
+            self.indexing_threads[key] = thread
+            thread.start()
+
+    def reindex(self, project_path: str, language: str):
+        try:
+            self.chroma_db.add_files_from_project_to_db(project_path, language)
+        except Exception:
+            logging.exception(f"Background reindex of '{project_path}' failed")
+
+    def submit_query(self, query: str, project_path: str, language: str, model_type: str, model_name: str) -> Future:
+        """Run a query on the worker pool, returning a future of its query() result."""
+        return self.query_executor.submit(self.query, query, project_path, language, model_type, model_name)
+
+    def query(self, query: str, project_path: str, language: str, model_type: str, model_name: str) -> dict:
+        start = time.perf_counter()
+        analyzer, warm = self.get_analyzer(project_path, model_type, model_name)
+        self.ensure_index(project_path, language)
+        # queries share the project's conversation thread whatever the model, so one query per thread at a time
+        with self.thread_lock(project_path):
+            response = analyzer.query_model(query, project_path, language, reindex=False, thread_id=project_path)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        with self.lock:
+            self.latencies["warm" if warm else "cold"].append(latency_ms)
+        logging.info(f"Answered query for '{project_path}' in {latency_ms:.0f} ms ({'warm' if warm else 'cold'})")
+        return {"response": response, "warm": warm, "latency_ms": latency_ms}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "analyzers": len(self.analyzers),
+                "answer_cache": self.answer_cache.stats(),
+                "question_cache": self.chroma_db.question_cache.stats(),
+                "embedding_cache": self.chroma_db.embedding_function.stats(),
+                "latency_ms": {
+                    kind: {
+                        "count": len(values),
+                        "mean": sum(values) / len(values) if values else 0.0,
+                    }
+                    for kind, values in self.latencies.items()
+                },
+            }
+
+
+def create_server(service: AnalyzerService, host: str, port: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/stats":
+                self.send_json(200, service.stats())
+            elif self.path == "/metrics":
+                self.send_text(200, metrics.to_prometheus())
+            else:
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/query":
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                result = service.submit_query(body["query"], body["project_path"], body["language"],
+                                              body.get("model_type", "chatgpt"),
+                                              body.get("model_name", "gpt-4o")).result()
+            except (KeyError, ValueError) as error:
+                self.send_json(400, {"error": str(error)})
+                return
+            except Exception as error:
+                logging.exception("Query failed")
+                self.send_json(500, {"error": str(error)})
+                return
+            self.send_json(200, result)
+
+        def send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_text(self, status: int, text: str):
+            body = text.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, message_format, *args):
+            logging.debug(message_format % args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(filename)s - %(funcName)s - line %(lineno)d - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Serve project analysis queries from warm analyzers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--watch", action="store_true",
+                        help="keep indexes live with a filesystem watcher instead of reindexing per query")
+    parser.add_argument("--collection-per-project", action="store_true",
+                        help="store each project in its own Chroma collection instead of one shared collection")
+    parser.add_argument("--workers", type=int, default=QUERY_WORKERS, help="maximum number of concurrent queries")
+    args = parser.parse_args()
+
+    analyzer_service = AnalyzerService(watch=args.watch, per_project_collections=args.collection_per_project,
+                                       workers=args.workers)
+    server = create_server(analyzer_service, args.host, args.port)
+    logging.info(f"Analyzer service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        analyzer_service.query_executor.shutdown(cancel_futures=True)
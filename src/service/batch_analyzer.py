@@ -0,0 +1,151 @@
+"""Answer a file of questions about one project in a single run.
+
+Run from the repository root:
+    python -m src.service.batch_analyzer queries.jsonl /path/to/project python --output answers.jsonl
+
+Each input line is a JSON object with a "query" and an optional "id" (the line number otherwise). Answers are
+appended to the output as they complete, so an interrupted run picks up where it stopped when started again with
+the same output file; queries that failed are retried.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from src.ai.ai_code_analyzer.ai_analyzer import AiProjectAnalyzer
+
+CONCURRENCY = 4
+REQUESTS_PER_SECOND = 2.0
+
+
+def load_queries(queries_path: str) -> list:
+    with open(queries_path, "r") as file:
+        entries = [json.loads(line) for line in file if line.strip()]
+    return [{"id": str(entry.get("id", line_number)), "query": entry["query"]}
+            for line_number, entry in enumerate(entries, start=1)]
+
+
+def answered_ids(output_path: str) -> set:
+    """Return the ids that already have an answer in the output file, if it exists.
+
+    Lines that do not parse, like one cut off when a previous run was killed mid-write, are skipped so their
+    queries are answered again.
+    """
+    answered = set()
+    try:
+        with open(output_path, "r") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping unreadable line {line_number} of {output_path}")
+                    continue
+                if "response" in result:
+                    answered.add(result["id"])
+    except FileNotFoundError:
+        pass
+    return answered
+
+
+def end_with_newline(output_path: str):
+    """Terminate a partially written last line, so appended results start on a line of their own."""
+    try:
+        with open(output_path, "rb+") as file:
+            if file.seek(0, os.SEEK_END) == 0:
+                return
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                file.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+
+class BatchAnalyzer:
+    """Indexes a project once, then answers many independent queries concurrently under a rate limit."""
+
+    def __init__(self, project_path: str, language: str, model_type: str, model_name: str,
+                 concurrency: int = CONCURRENCY, requests_per_second: float = REQUESTS_PER_SECOND):
+        self.project_path = project_path
+        self.language = language
+        self.concurrency = concurrency
+        self.project_analyzer = AiProjectAnalyzer(project_path, model_type=model_type, model_name=model_name)
+        self.rate_limiter = InMemoryRateLimiter(requests_per_second=requests_per_second,
+                                                max_bucket_size=concurrency)
+        self.output_lock = threading.Lock()
+        # thread ids are unique per run, so a rerun or a resume never loads an earlier run's answers as history
+        self.run_id = uuid.uuid4().hex
+
+    def run(self, queries_path: str, output_path: str) -> dict:
+        """Answer every query of the input not yet answered in the output, appending results as they finish."""
+        start = time.perf_counter()
+        done = answered_ids(output_path)
+        pending = [entry for entry in load_queries(queries_path) if entry["id"] not in done]
+        logging.info(f"{len(done)} queries already answered, {len(pending)} to go")
+        if not pending:
+            return {"answered": 0, "failed": 0, "skipped": len(done), "seconds": 0.0}
+
+        self.project_analyzer.refresh_index(self.project_path, self.language)
+        # one batched embedding call warms the cache every answer cache lookup and retrieval reads from
+        self.project_analyzer.ai_handler.chroma_db.embedding_function.embed_queries(
+            [entry["query"] for entry in pending])
+
+        end_with_newline(output_path)
+        with open(output_path, "a") as output, ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(lambda entry: self.answer(entry, output), pending))
+
+        failed = sum(1 for result in results if "error" in result)
+        summary = {"answered": len(results) - failed, "failed": failed, "skipped": len(done),
+                   "seconds": time.perf_counter() - start}
+        logging.info(f"Batch finished: {summary}")
+        return summary
+
+    def answer(self, entry: dict, output) -> dict:
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        # a thread per query keeps independent questions out of each other's conversation state
+        thread_id = f"{self.project_path}#batch-{self.run_id}-{entry['id']}"
+        try:
+            response = self.project_analyzer.query_model(entry["query"], self.project_path, self.language,
+                                                         reindex=False, thread_id=thread_id)
+            result = {**entry, "response": response}
+        except Exception as error:
+            logging.exception(f"Query {entry['id']} failed")
+            result = {**entry, "error": str(error)}
+        finally:
+            self.project_analyzer.checkpointer.delete_thread(thread_id)
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+
+        with self.output_lock:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+        return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(filename)s - %(funcName)s - line %(lineno)d - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions about a project.")
+    parser.add_argument("queries", help="JSONL file with one {\"query\": ..., \"id\": ...} object per line")
+    parser.add_argument("project_path")
+    parser.add_argument("language", choices=["python", "java"])
+    parser.add_argument("--output", required=True, help="JSONL file answers are appended to")
+    parser.add_argument("--model-type", default="chatgpt", choices=["chatgpt", "llama"])
+    parser.add_argument("--model-name", default="gpt-4o")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="maximum concurrent generations")
+    parser.add_argument("--requests-per-second", type=float, default=REQUESTS_PER_SECOND,
+                        help="rate limit on started queries")
+    args = parser.parse_args()
+
+    batch_analyzer = BatchAnalyzer(args.project_path, args.language, args.model_type, args.model_name,
+                                   concurrency=args.concurrency, requests_per_second=args.requests_per_second)
+    print(json.dumps(batch_analyzer.run(args.queries, args.output), indent=2))
@@ -1,13 +1,42 @@
+import argparse
+
 from src.ai.ai_code_analyzer.ai_analyzer import AiProjectAnalyzer
 
 
-def analyze(query: str, project_path: str, language: str, model_type: str, model_name: str):
+def analyze(query: str, project_path: str, language: str, model_type: str, model_name: str, stream: bool = False):
     """This function processes a given user query, using the project path and programming language
     as additional context. It leverages an AI model to analyze the query in the specified project scope
     and returns a structured response based on relevant documents and context."""
 
     project_analyzer = AiProjectAnalyzer(project_path, model_type=model_type, model_name=model_name)
 
+    if stream:
+        stream_analyze(project_analyzer, query, project_path, language)
+        return
+
     response = project_analyzer.query_model(query, project_path, language)
     print("----------------------Response----------------")
     print(f"Response for Document : {response}")
+
+
+def stream_analyze(project_analyzer: AiProjectAnalyzer, query: str, project_path: str, language: str):
+    """Print the response token by token as it is generated, followed by its latency."""
+    print("----------------------Response----------------")
+    for token in project_analyzer.stream_query(query, project_path, language):
+        print(token, end="", flush=True)
+    timings = project_analyzer.last_stream_timings
+    print(f"\n----------------------First token after {timings['time_to_first_token_ms']:.0f} ms, "
+          f"total {timings['total_ms']:.0f} ms----------------")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask an AI model a question about a project.")
+    parser.add_argument("query")
+    parser.add_argument("project_path")
+    parser.add_argument("language", choices=["python", "java"])
+    parser.add_argument("--model-type", default="chatgpt", choices=["chatgpt", "llama"])
+    parser.add_argument("--model-name", default="gpt-4o")
+    parser.add_argument("--stream", action="store_true", help="print tokens live as they are generated")
+    args = parser.parse_args()
+
+    analyze(args.query, args.project_path, args.language, args.model_type, args.model_name, stream=args.stream)
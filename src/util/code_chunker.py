@@ -0,0 +1,172 @@
+import ast
+import os
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+
+MAX_CHUNK_LINES = 120
+SMALL_FILE_LINES = 40
+
+JAVA_TYPE_RE = re.compile(r"\b(class|interface|enum|record)\s+(\w+)")
+JAVA_METHOD_RE = re.compile(r"(\w+)\s*\((?:[^()]|\([^()]*\))*\)\s*(?:throws\s+[\w.,\s]+)?$")
+
+
+@dataclass
+class CodeChunk:
+    content: str
+    symbol: str
+    start_line: int
+    end_line: int
+
+
+def chunk_file(file_path: str, content: str) -> list[CodeChunk]:
+    """Split a file into chunks at function and class boundaries, falling back to line windows."""
+    lines = content.splitlines()
+    file_name = os.path.basename(file_path)
+    if len(lines) <= SMALL_FILE_LINES:
+        return [CodeChunk(content, file_name, 1, max(len(lines), 1))]
+
+    if file_path.endswith(".py"):
+        spans = python_spans(content)
+    elif file_path.endswith(".java"):
+        spans = java_spans(content)
+    else:
+        spans = None
+
+    if spans is None:
+        return window_chunks(lines, file_name, 1, len(lines))
+    return spans_to_chunks(lines, spans, file_name)
+
+
+def python_spans(content: str) -> list[tuple] | None:
+    """Return (symbol, start_line, end_line) for top-level definitions, splitting large classes by method."""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+    spans = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        if isinstance(node, ast.ClassDef) and node.end_lineno - start + 1 > MAX_CHUNK_LINES:
+            methods = [child for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            first_method_line = min(
+                [min([method.lineno] + [d.lineno for d in method.decorator_list]) for method in methods],
+                default=node.end_lineno + 1)
+            spans.append((node.name, start, first_method_line - 1))
+            for method in methods:
+                method_start = min([method.lineno] + [d.lineno for d in method.decorator_list])
+                spans.append((f"{node.name}.{method.name}", method_start, method.end_lineno))
+        else:
+            spans.append((node.name, start, node.end_lineno))
+    return spans
+
+
+def java_tokens(content: str):
+    """Yield (offset, char) for the parentheses, braces and semicolons of Java code outside comments and strings."""
+    i = 0
+    length = len(content)
+    while i < length:
+        char = content[i]
+        if content.startswith("//", i):
+            newline = content.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+        if content.startswith("/*", i):
+            end = content.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if content.startswith('"""', i):
+            end = content.find('"""', i + 3)
+            i = length if end == -1 else end + 3
+            continue
+        if char in "\"'":
+            j = i + 1
+            while j < length and content[j] != char and content[j] != "\n":
+                j += 2 if content[j] == "\\" else 1
+            i = j + 1
+            continue
+        if char in "(){};":
+            yield i, char
+        i += 1
+
+
+def java_spans(content: str) -> list[tuple]:
+    """Return (symbol, start_line, end_line) for members of top-level Java types using a brace scanner."""
+    line_starts = [0] + [match.end() for match in re.finditer("\n", content)]
+
+    def line_of(offset: int) -> int:
+        return bisect_right(line_starts, offset)
+
+    spans = []
+    depth = 0
+    parens = 0
+    boundary = 0
+    type_name = None
+    member = None
+    for i, char in java_tokens(content):
+        if char == "(":
+            parens += 1
+        elif char == ")":
+            parens = max(parens - 1, 0)
+        elif char == "{":
+            # braces inside parentheses are annotation or argument initializers, not members
+            header = content[boundary:i]
+            if depth == 0 and not parens:
+                type_match = JAVA_TYPE_RE.search(header)
+                type_name = type_match.group(2) if type_match else type_name
+                boundary = i + 1
+            elif depth == 1 and not parens:
+                start = boundary + len(header) - len(header.lstrip())
+                member = (member_symbol(header.strip(), type_name), start)
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 1 and member:
+                symbol, start = member
+                spans.append((symbol, line_of(start), line_of(i)))
+                member = None
+            if depth <= 1 and not parens:
+                boundary = i + 1
+        elif char == ";" and depth <= 1:
+            boundary = i + 1
+    return spans
+
+
+def member_symbol(header: str, type_name: str | None) -> str:
+    type_match = JAVA_TYPE_RE.search(header)
+    method_match = JAVA_METHOD_RE.search(header)
+    if type_match:
+        name = type_match.group(2)
+    elif method_match:
+        name = method_match.group(1)
+    else:
+        name = "<block>"
+    return f"{type_name}.{name}" if type_name else name
+
+
+def spans_to_chunks(lines: list, spans: list, gap_symbol: str) -> list[CodeChunk]:
+    """Turn symbol spans into chunks, grouping the code between them and splitting oversized spans."""
+    chunks = []
+    next_line = 1
+    for symbol, start, end in sorted(spans, key=lambda span: span[1]):
+        if start < next_line:
+            continue
+        chunks.extend(window_chunks(lines, gap_symbol, next_line, start - 1))
+        chunks.extend(window_chunks(lines, symbol, start, end))
+        next_line = end + 1
+    chunks.extend(window_chunks(lines, gap_symbol, next_line, len(lines)))
+    return chunks
+
+
+def window_chunks(lines: list, symbol: str, start: int, end: int) -> list[CodeChunk]:
+    """Split lines start..end (1-based, inclusive) into chunks of at most MAX_CHUNK_LINES, skipping blank runs."""
+    chunks = []
+    for window_start in range(start, end + 1, MAX_CHUNK_LINES):
+        window_end = min(window_start + MAX_CHUNK_LINES - 1, end)
+        text = "\n".join(lines[window_start - 1:window_end])
+        if text.strip():
+            chunks.append(CodeChunk(text, symbol, window_start, window_end))
+    return chunks
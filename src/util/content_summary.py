@@ -1,29 +1,174 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 from langchain_core.messages import HumanMessage
 from langchain_ollama import ChatOllama
 
-from src.ai.ai_code_analyzer.prompts import summary_prompt
+from src.ai.ai_code_analyzer.prompts import segment_summary_prompt
+from src.util.utils import hash_project_path, estimate_tokens
+
+SUMMARY_MODEL = "llama3.2"
+MEMORY_DIR = "conversation_memory"
+TOKEN_BUDGET = 2500
+SEGMENT_SUMMARY_SIZE = 2000
+MERGE_FANOUT = 4
+
+compaction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-compaction")
+
+
+@lru_cache(maxsize=None)
+def summary_llm(model_name: str = SUMMARY_MODEL) -> ChatOllama:
+    """Return a shared summarization client instead of building one per call."""
+    return ChatOllama(model=model_name)
+
+
+def format_turn(turn: dict) -> str:
+    return f"\nUser Query: {turn['query']}\nAI Response: {turn['response']}\n"
+
+
+def update_summary(query: str, response: str, project_path: str) -> str:
+    """Record a turn in the project's conversation memory and return the summarized history.
+
+    Summarization happens in the background, so recording a turn never waits on the LLM.
+    """
+    memory = get_conversation_memory(project_path)
+    memory.append(query, response)
+    return memory.context()
+
+
+class ConversationMemory:
+    """Rolling per-project conversation memory made of recent raw turns and summaries of older segments.
+
+    Appending a turn is a single line written to disk. Once the raw turns exceed the token budget the oldest of
+    them, about a token budget's worth at a time, are summarized as segments on a background thread. Whenever
+    MERGE_FANOUT summaries share a level they are merged into one summary a level up, so each part of the
+    history is re-summarized at most once per level.
+    """
+
+    def __init__(self, project_path: str, memory_dir: str = MEMORY_DIR, token_budget: int = TOKEN_BUDGET):
+        self.directory = os.path.join(memory_dir, hash_project_path(project_path))
+        self.turns_path = os.path.join(self.directory, "turns.jsonl")
+        self.summaries_path = os.path.join(self.directory, "summaries.json")
+        self.token_budget = token_budget
+        self.lock = threading.Lock()
+        self.compaction = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.turns = self.load_turns()
+        self.summaries = self.load_summaries()
+
+    def load_turns(self) -> list:
+        try:
+            with open(self.turns_path, "r") as file:
+                return [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def load_summaries(self) -> list:
+        try:
+            with open(self.summaries_path, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def append(self, query: str, response: str):
+        """Record a turn and schedule compaction in the background once the token budget is crossed."""
+        turn = {"query": query, "response": response}
+        with self.lock:
+            with open(self.turns_path, "a") as file:
+                file.write(json.dumps(turn) + "\n")
+            self.turns.append(turn)
+            if self.over_budget() and (self.compaction is None or self.compaction.done()):
+                self.compaction = compaction_executor.submit(self.compact)
+
+    def over_budget(self) -> bool:
+        return estimate_tokens("".join(format_turn(turn) for turn in self.turns)) > self.token_budget
+
+    def oldest_segment(self) -> list:
+        """Return the oldest raw turns up to about the token budget, and at least one turn."""
+        segment, tokens = [], 0
+        for turn in self.turns:
+            tokens += estimate_tokens(format_turn(turn))
+            if segment and tokens > self.token_budget:
+                break
+            segment.append(turn)
+        return segment
+
+    def compact(self):
+        """Summarize the oldest turns into a new segment, then merge full levels of segment summaries.
+
+        Turns appended while this runs can leave the memory over budget again, so it reschedules itself until
+        the raw turns fit.
+        """
+        try:
+            with self.lock:
+                segment = self.oldest_segment()
+            summary = self.summarize("".join(format_turn(turn) for turn in segment))
+
+            with self.lock:
+                self.summaries.append({"level": 0, "text": summary})
+                self.write_summaries()
+                self.turns = self.turns[len(segment):]
+                self.write_turns()
+
+            while group := self.full_level_group():
+                merged = self.summarize("\n\n".join(summary["text"] for summary in group))
+                with self.lock:
+                    position = self.summaries.index(group[0])
+                    self.summaries[position:position + len(group)] = [
+                        {"level": group[0]["level"] + 1, "text": merged}]
+
+            with self.lock:
+                self.write_summaries()
+                if self.over_budget():
+                    self.compaction = compaction_executor.submit(self.compact)
+        except Exception:
+            logging.exception(f"Compacting conversation memory in {self.directory} failed")
+
+    def full_level_group(self) -> list:
+        """Return the first MERGE_FANOUT summaries of the lowest level that has that many, if any."""
+        for level in sorted({summary["level"] for summary in self.summaries}):
+            group = [summary for summary in self.summaries if summary["level"] == level]
+            if len(group) >= MERGE_FANOUT:
+                return group[:MERGE_FANOUT]
+        return []
+
+    @staticmethod
+    def summarize(content: str) -> str:
+        messages = [HumanMessage(content=segment_summary_prompt(content, SEGMENT_SUMMARY_SIZE))]
+        return summary_llm().invoke(messages).content
+
+    def write_turns(self):
+        temp_path = f"{self.turns_path}.tmp"
+        with open(temp_path, "w") as file:
+            file.writelines(json.dumps(turn) + "\n" for turn in self.turns)
+        os.replace(temp_path, self.turns_path)
+
+    def write_summaries(self):
+        temp_path = f"{self.summaries_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.summaries, file)
+        os.replace(temp_path, self.summaries_path)
 
+    def context(self) -> str:
+        """Return the summarized history followed by the recent raw turns."""
+        with self.lock:
+            summaries = "\n\n".join(summary["text"] for summary in self.summaries)
+            recent = "".join(format_turn(turn) for turn in self.turns)
+        return f"{summaries}\n{recent}" if summaries else recent
 
-def update_summary(query: str, response: str):
-    try:
-        with open('summary.txt', 'r') as file:
-            previous_summary = file.read()
-    except FileNotFoundError:
-        previous_summary = ""
 
-    new_entry = f"\nUser Query: {query}\nAI Response: {response}\n"
-    combined_summary = summarize_conversation(previous_summary, new_entry)
-    with open('summary.txt', 'w') as file:
-        file.write(combined_summary)
-    return combined_summary
+memories = {}
+memories_lock = threading.Lock()
 
 
-def summarize_conversation(previous_entry: str, new_entry: str) -> str:
-    """Summarize the previous conversation and the new entry, combining them into a concise summary."""
-    acceptable_size = 10000
-    if len(previous_entry) + len(new_entry) > acceptable_size:
-        messages = [HumanMessage(content=summary_prompt(previous_entry, new_entry, acceptable_size))]
-        summary_response = ChatOllama(model="llama3.2").invoke(messages)
-        return summary_response.content
-    else:
-        return previous_entry + new_entry
+def get_conversation_memory(project_path: str) -> ConversationMemory:
+    """Return the process-wide memory for a project so every caller appends to the same store."""
+    with memories_lock:
+        if project_path not in memories:
+            memories[project_path] = ConversationMemory(project_path)
+        return memories[project_path]
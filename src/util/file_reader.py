@@ -1,21 +1,97 @@
 import logging
 import os
-from glob import glob
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from fnmatch import fnmatch
+
+from src.util.metrics import metrics
+
+IGNORED_DIRECTORIES = {
+    ".git", ".hg", ".svn", ".idea", ".vscode", ".gradle", ".mvn", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", "__pycache__",
+    "node_modules", "target", "build", "dist", "out", "venv", ".venv", "env",
+}
+MAX_FILE_SIZE = 1024 * 1024
+BINARY_SNIFF_BYTES = 8192
 
 
 def read_file(file_path):
-    if os.path.getsize(file_path) == 0:
+    """Read a text file, returning None for binary files."""
+    with open(file_path, "rb") as file:
+        data = file.read()
+    metrics.increment("bytes_read", len(data))
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        logging.warning(f"Skipping binary file: {file_path}")
+        return None
+    # stripped only for the emptiness check, so chunk and symbol line numbers match the file
+    content = data.decode("utf-8", errors="replace")
+    if not content.strip():
         logging.warning(f"Skipping empty file: {file_path}")
         return "empty file"
-    with open(file_path, "r") as file:
-        file_content = file.read().strip()
-    return file_content
+    return content
+
+
+class IgnoreRules:
+    """Patterns from .gitignore files, applied relative to the directory that declared them."""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+
+    def extended_with(self, directory: str) -> "IgnoreRules":
+        """Return the rules with the patterns of the directory's .gitignore appended, if it has one."""
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", errors="replace") as file:
+                lines = file.read().splitlines()
+        except OSError:
+            return self
+
+        rules = list(self.rules)
+        for line in lines:
+            pattern = line.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negate = pattern.startswith("!")
+            pattern = pattern.lstrip("!")
+            directory_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            # a leading **/ matches in any directory, like a pattern without a slash does
+            any_depth = pattern.startswith("**/")
+            if any_depth:
+                pattern = pattern[3:]
+            anchored = "/" in pattern and not any_depth
+            rules.append((directory, pattern.lstrip("/"), negate, directory_only, anchored))
+        return IgnoreRules(rules)
+
+    def is_ignored(self, path: str, is_directory: bool) -> bool:
+        """Apply the rules in order, the last matching pattern deciding like git does."""
+        ignored = False
+        for base, pattern, negate, directory_only, anchored in self.rules:
+            if directory_only and not is_directory:
+                continue
+            relative_path = os.path.relpath(path, base).replace(os.sep, "/")
+            if relative_path.startswith(".."):
+                continue
+            if anchored or "/" not in pattern:
+                targets = [relative_path if anchored else os.path.basename(path)]
+            else:
+                parts = relative_path.split("/")
+                targets = ["/".join(parts[i:]) for i in range(len(parts))]
+            if any(fnmatch(target, pattern) for target in targets):
+                ignored = not negate
+        return ignored
 
 
 class FileReader:
-    def __init__(self, project_path, language):
+    def __init__(self, project_path, language, max_workers=1, max_file_size=MAX_FILE_SIZE, record_metrics=True):
+        """record_metrics=False keeps walks that are not part of indexing, like a watcher's polls, out of the
+        files_scanned and file_walk metrics."""
         self.project_path = project_path
         self.language = language
+        self.max_workers = max_workers
+        self.max_file_size = max_file_size
+        self.record_metrics = record_metrics
         self.allowed_extensions = self.get_allowed_extensions()
 
     def get_allowed_extensions(self):
@@ -29,20 +105,100 @@ class FileReader:
 
     def read_all_files(self):
         """Read all relevant files in the project directory."""
-        files = self.get_files()
-        return {file: read_file(file) for file in files}
+        return dict(self.iter_file_contents())
 
     def get_files(self):
         """Get all relevant files in the project directory based on file extensions."""
-        files = []
-        for extension in self.allowed_extensions:
-            files.extend(
-                glob(
-                    os.path.join(self.project_path, "**", f"*{extension}"),
-                    recursive=True,
-                )
-            )
-        return files
+        return list(self.iter_files())
+
+    def is_relevant(self, file_path):
+        """Check a single path against the extension, ignored-directory, .gitignore and size filters of the walk."""
+        relative_parts = os.path.relpath(file_path, self.project_path).split(os.sep)
+        if relative_parts[0] == ".." or IGNORED_DIRECTORIES.intersection(relative_parts[:-1]):
+            return False
+        if not file_path.endswith(tuple(self.allowed_extensions)):
+            return False
+        if self.is_git_ignored(file_path, relative_parts):
+            return False
+        try:
+            return os.path.getsize(file_path) <= self.max_file_size
+        except OSError:
+            return False
+
+    def is_git_ignored(self, file_path, relative_parts):
+        """Apply the .gitignore files from the project root down to the file, as the walk would."""
+        rules, directory = IgnoreRules(), self.project_path
+        for part in relative_parts[:-1]:
+            rules = rules.extended_with(directory)
+            directory = os.path.join(directory, part)
+            if rules.is_ignored(directory, True):
+                return True
+        return rules.extended_with(directory).is_ignored(file_path, False)
+
+    def iter_files(self):
+        """Yield relevant files in a single directory walk, pruning ignored directories and oversized files."""
+        pending_directories = [(self.project_path, IgnoreRules())]
+        seen_files = set()
+        # only the walk itself is timed, not what the consumer does between files
+        walk_seconds, resumed = 0.0, time.perf_counter()
+        try:
+            while pending_directories:
+                directory, rules = pending_directories.pop()
+                rules = rules.extended_with(directory)
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError as error:
+                    logging.warning(f"Skipping unreadable directory {directory}: {error}")
+                    continue
+
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRECTORIES and not rules.is_ignored(entry.path, True):
+                            pending_directories.append((entry.path, rules))
+                    elif entry.is_file() and entry.name.endswith(tuple(self.allowed_extensions)):
+                        if entry.path in seen_files or rules.is_ignored(entry.path, False):
+                            continue
+                        if entry.stat().st_size > self.max_file_size:
+                            logging.warning(f"Skipping file larger than {self.max_file_size} bytes: {entry.path}")
+                            continue
+                        seen_files.add(entry.path)
+                        if self.record_metrics:
+                            metrics.increment("files_scanned")
+                        walk_seconds += time.perf_counter() - resumed
+                        yield entry.path
+                        resumed = time.perf_counter()
+            walk_seconds += time.perf_counter() - resumed
+        finally:
+            if self.record_metrics:
+                metrics.observe("file_walk", walk_seconds)
+
+    def iter_file_contents(self, file_paths=None):
+        """Yield (path, content) as files are read, reading on a thread pool when max_workers > 1."""
+        file_paths = self.iter_files() if file_paths is None else file_paths
+        if self.max_workers <= 1:
+            for file_path in file_paths:
+                content = read_file(file_path)
+                if content is not None:
+                    yield file_path, content
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # a bounded window of in-flight reads keeps memory flat on large trees; each read runs in a copy of
+            # the caller's context so its metrics count towards the query that triggered it
+            in_flight = deque()
+            for file_path in file_paths:
+                in_flight.append((file_path, executor.submit(copy_context().run, read_file, file_path)))
+                if len(in_flight) >= self.max_workers * 4:
+                    yield from self.completed_read(in_flight)
+            while in_flight:
+                yield from self.completed_read(in_flight)
+
+    @staticmethod
+    def completed_read(in_flight: deque):
+        file_path, future = in_flight.popleft()
+        content = future.result()
+        if content is not None:
+            yield file_path, content
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+DEBOUNCE_SECONDS = 1.0
+POLL_INTERVAL_SECONDS = 2.0
+
+
+class ProjectWatcher:
+    """Collect file changes in a project and hand the touched paths to a callback once edits settle.
+
+    Uses watchdog (inotify on Linux) when it is installed and falls back to polling file stats otherwise.
+    """
+
+    def __init__(self, reader, on_change, indexed_files=None, debounce_seconds: float = DEBOUNCE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL_SECONDS):
+        """indexed_files, if given, returns the paths currently indexed, to find the files of a removed directory."""
+        self.reader = reader
+        self.on_change = on_change
+        self.indexed_files = indexed_files
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.touched_files = set()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.timer = None
+        self.observer = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(WatchdogHandler(self), self.reader.project_path, recursive=True)
+            self.observer.start()
+            logging.info(f"Watching '{self.reader.project_path}' for changes")
+        else:
+            threading.Thread(target=self.poll, daemon=True).start()
+            logging.info(f"Polling '{self.reader.project_path}' for changes every {self.poll_interval}s")
+
+    def stop(self):
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+
+    def notify(self, file_path: str):
+        """Record a touched path and restart the debounce timer."""
+        if not file_path.endswith(tuple(self.reader.allowed_extensions)):
+            return
+        with self.lock:
+            self.touched_files.add(file_path)
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce_seconds, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def notify_directory(self, directory: str):
+        """Record every indexed file under a directory that was deleted or moved away as a whole."""
+        if self.indexed_files is None:
+            return
+        prefix = os.path.join(directory, "")
+        for file_path in self.indexed_files():
+            if file_path.startswith(prefix):
+                self.notify(file_path)
+
+    def flush(self):
+        # one flush at a time, so edits arriving mid-reindex wait for the next round instead of racing it
+        with self.flush_lock:
+            with self.lock:
+                touched_files, self.touched_files = self.touched_files, set()
+            if not touched_files or self.stopped.is_set():
+                return
+            try:
+                self.on_change(sorted(touched_files))
+            except Exception:
+                logging.exception(f"Reindexing changed files in '{self.reader.project_path}' failed")
+
+    def poll(self):
+        snapshot = self.snapshot()
+        while not self.stopped.wait(self.poll_interval):
+            current = self.snapshot()
+            for file_path in set(snapshot) | set(current):
+                if snapshot.get(file_path) != current.get(file_path):
+                    self.notify(file_path)
+            snapshot = current
+
+    def snapshot(self) -> dict:
+        stats = {}
+        for file_path in self.reader.iter_files():
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            stats[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+
+class WatchdogHandler(FileSystemEventHandler):
+    def __init__(self, watcher: ProjectWatcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            # a directory moved out of the project or deleted may come without an event for each file in it
+            if event.event_type in ("deleted", "moved"):
+                self.watcher.notify_directory(os.fsdecode(event.src_path))
+            return
+        for file_path in (event.src_path, getattr(event, "dest_path", "")):
+            if file_path:
+                self.watcher.notify(os.fsdecode(file_path))
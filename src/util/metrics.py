@@ -0,0 +1,146 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+METRIC_PREFIX = "ai_project_reader"
+
+
+class QueryMetrics:
+    """Stage timings and counters collected while answering a single query."""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(float)
+
+    def summary(self) -> dict:
+        return {
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+current_query_metrics = ContextVar("current_query_metrics", default=None)
+
+
+class Metrics:
+    """Process-wide counters and stage timings, also attributed to the query being answered, if any.
+
+    Stages may nest, e.g. the query embedding is timed inside retrieval, so stage times do not add up to the
+    query total.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.stage_seconds = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+
+    def increment(self, name: str, amount: float = 1):
+        query_metrics = current_query_metrics.get()
+        with self.lock:
+            self.counters[name] += amount
+            if query_metrics is not None:
+                query_metrics.counters[name] += amount
+
+    def observe(self, stage: str, seconds: float):
+        """Record time spent in a stage that was measured by the caller."""
+        query_metrics = current_query_metrics.get()
+        with self.lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_counts[stage] += 1
+            if query_metrics is not None:
+                query_metrics.stages[stage] += seconds
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def query_scope(self, label: str):
+        """Collect the metrics of one query and log them as a structured summary when it completes."""
+        query_metrics = QueryMetrics()
+        token = current_query_metrics.set(query_metrics)
+        try:
+            with self.span("query"):
+                yield query_metrics
+        finally:
+            current_query_metrics.reset(token)
+            logging.info(f"Query metrics for '{label}': {json.dumps(query_metrics.summary())}")
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            lines = []
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+                lines.append(f"{METRIC_PREFIX}_{name}_total {value:g}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_seconds summary")
+            for stage in sorted(self.stage_seconds):
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {self.stage_seconds[stage]:.6f}')
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{stage}"}} {self.stage_counts[stage]}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times retrieval and LLM calls of a LangChain run and counts retrieved documents and tokens."""
+
+    def __init__(self, contextualize_tag: str):
+        self.contextualize_tag = contextualize_tag
+        self.started = {}
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self.started[run_id] = ("retrieval", time.perf_counter(), 0)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self.finish(run_id)
+        metrics.increment("documents_retrieved", len(documents))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        stage = "question_contextualization" if self.contextualize_tag in (tags or []) else "generation"
+        prompt_characters = sum(len(str(message.content)) for batch in messages for message in batch)
+        self.started[run_id] = (stage, time.perf_counter(), prompt_characters // 4)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stage, _, estimated_prompt_tokens = self.started.get(run_id, ("generation", None, 0))
+        self.finish(run_id)
+        prompt_tokens, completion_tokens = reported_token_usage(response)
+        metrics.increment("prompt_tokens", prompt_tokens if prompt_tokens is not None else estimated_prompt_tokens)
+        if completion_tokens is not None:
+            metrics.increment("completion_tokens", completion_tokens)
+        metrics.increment(f"{stage}_calls")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.finish(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self.finish(run_id)
+
+    def finish(self, run_id):
+        started = self.started.pop(run_id, None)
+        if started:
+            stage, start, _ = started
+            metrics.observe(stage, time.perf_counter() - start)
+
+
+def reported_token_usage(response) -> tuple:
+    """Return (prompt, completion) tokens as reported by the model, or None for whatever it did not report."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens"), usage.get("output_tokens")
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens"), token_usage.get("completion_tokens")
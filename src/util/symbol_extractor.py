@@ -0,0 +1,121 @@
+import ast
+import os
+import re
+from dataclasses import dataclass, field
+
+from src.util.code_chunker import JAVA_TYPE_RE, java_tokens
+
+JAVA_COMMENT_OR_STRING_RE = re.compile(r'/\*.*?\*/|//[^\n]*|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.DOTALL)
+JAVA_PACKAGE_RE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+JAVA_IMPORT_RE = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+(?:\.\*)?)\s*;", re.MULTILINE)
+JAVA_METHOD_DECLARATION_RE = re.compile(
+    r"^\s*(?:@\w+(?:\([^)]*\))?\s+)*(?:(?:public|protected|private|static|final|abstract|synchronized|native|default)"
+    r"\s+)*(?:<[^;{}()=]*>\s+)?([\w.?\[\]]+(?:<[^;{}()=]*>)?(?:\[\])*)\s+(\w+)\s*\(", re.MULTILINE)
+JAVA_CALL_RE = re.compile(r"\b(\w+)\s*\(")
+JAVA_TYPE_REFERENCE_RE = re.compile(r"\b([A-Z]\w*)\b")
+JAVA_KEYWORDS = {
+    "if", "for", "while", "switch", "catch", "return", "new", "else", "throw", "case", "synchronized", "super",
+    "this", "try", "do", "assert", "class", "interface", "enum", "record", "package", "import",
+}
+
+
+@dataclass
+class FileSymbols:
+    module: str
+    definitions: list = field(default_factory=list)
+    imports: list = field(default_factory=list)
+    references: list = field(default_factory=list)
+
+
+def extract_symbols(project_path: str, file_path: str, content: str) -> FileSymbols | None:
+    """Extract the definitions, imports and referenced names of a Python or Java file, None for other files."""
+    relative_path = os.path.relpath(file_path, project_path).replace(os.sep, "/")
+    if file_path.endswith(".py"):
+        return python_symbols(relative_path, content)
+    if file_path.endswith(".java"):
+        return java_symbols(relative_path, content)
+    return None
+
+
+def python_symbols(relative_path: str, content: str) -> FileSymbols | None:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+    module = relative_path[:-len(".py")].replace("/", ".").removesuffix(".__init__")
+    symbols = FileSymbols(module)
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            symbols.definitions.append({"name": node.name, "kind": "class", "line": node.lineno})
+            symbols.definitions.extend(
+                {"name": f"{node.name}.{child.name}", "kind": "method", "line": child.lineno}
+                for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.definitions.append({"name": node.name, "kind": "function", "line": node.lineno})
+
+    imports, references = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.update(f"{node.module}.{alias.name}" for alias in node.names)
+        elif isinstance(node, ast.Call):
+            references.add(called_name(node.func))
+        elif isinstance(node, ast.ClassDef):
+            references.update(called_name(base) for base in node.bases)
+    symbols.imports = sorted(imports)
+    symbols.references = sorted(name for name in references if name)
+    return symbols
+
+
+def called_name(node: ast.AST) -> str | None:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def java_symbols(relative_path: str, content: str) -> FileSymbols:
+    # blank out comments and strings with spaces, keeping offsets and line breaks so positions stay correct
+    code = JAVA_COMMENT_OR_STRING_RE.sub(lambda match: re.sub(r"[^\n]", " ", match.group(0)), content)
+    package = JAVA_PACKAGE_RE.search(code)
+    file_name = os.path.splitext(os.path.basename(relative_path))[0]
+    symbols = FileSymbols(f"{package.group(1)}.{file_name}" if package else file_name)
+
+    def line_of(position: int) -> int:
+        return code.count("\n", 0, position) + 1
+
+    events = [(match.start(), "type", match) for match in JAVA_TYPE_RE.finditer(code)]
+    events += [(match.start(2), "method", match) for match in JAVA_METHOD_DECLARATION_RE.finditer(code)]
+    events += [(offset, char, None) for offset, char in java_tokens(code) if char in "{}"]
+    # enclosing types as (qualified name, depth of their body), so nested types and their members get their owner
+    types, depth, pending_type = [], 0, None
+    for position, kind, match in sorted(events, key=lambda event: event[0]):
+        if kind == "{":
+            depth += 1
+            if pending_type is not None:
+                types.append((pending_type, depth))
+                pending_type = None
+        elif kind == "}":
+            if types and types[-1][1] == depth:
+                types.pop()
+            depth -= 1
+        elif kind == "type":
+            pending_type = f"{types[-1][0]}.{match.group(2)}" if types else match.group(2)
+            symbols.definitions.append({"name": pending_type, "kind": match.group(1), "line": line_of(position)})
+        elif match.group(1) not in JAVA_KEYWORDS and match.group(2) not in JAVA_KEYWORDS:
+            # only declarations directly in a type body are members, not statements inside method bodies
+            if not types or types[-1][1] != depth:
+                continue
+            type_name = types[-1][0]
+            kind = "constructor" if match.group(2) == type_name.rsplit(".", 1)[-1] else "method"
+            symbols.definitions.append(
+                {"name": f"{type_name}.{match.group(2)}", "kind": kind, "line": line_of(position)})
+
+    symbols.imports = sorted(set(JAVA_IMPORT_RE.findall(code)))
+    body = JAVA_IMPORT_RE.sub("", JAVA_PACKAGE_RE.sub("", code))
+    references = set(JAVA_CALL_RE.findall(body)) | set(JAVA_TYPE_REFERENCE_RE.findall(body))
+    symbols.references = sorted(references - JAVA_KEYWORDS)
+    return symbols
@@ -1,6 +1,26 @@
 import hashlib
 
+# stay below SQLite's bound-parameter limit when a batch goes into one IN (...) clause
+SQLITE_PARAMETER_CHUNK = 500
+
 
 def hash_project_path(project_path: str) -> str:
     """Hash the project path to create a unique, deterministic string using MD5."""
     return hashlib.md5(project_path.encode()).hexdigest()
+
+
+def hash_content(content: str) -> str:
+    """Hash file content to a deterministic SHA-256 digest used for change detection."""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of text, at about four characters per token."""
+    return len(text) // 4
+
+
+def parameter_chunks(values: list, size: int = SQLITE_PARAMETER_CHUNK):
+    """Yield (chunk, placeholders) over slices of values small enough to bind in a single SQLite statement."""
+    for i in range(0, len(values), size):
+        chunk = values[i:i + size]
+        yield chunk, ",".join("?" * len(chunk))